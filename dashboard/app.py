@@ -1,17 +1,19 @@
 from fastapi import FastAPI, File, UploadFile
 from fastapi.params import Form
-from fastapi.responses import JSONResponse, HTMLResponse
+from fastapi.responses import FileResponse, JSONResponse, Response
 from fastapi.staticfiles import StaticFiles
 import os
-import json
-import pandas as pd
+import sys
+import tempfile
+import orjson
+from collections import Counter, defaultdict
+from typing import Any, Callable, Dict, List, Optional, Tuple
+from pydantic import TypeAdapter, ValidationError
 from dotenv import load_dotenv, find_dotenv
 import logging
 from regressionanalyser.parser.cucumber_parser import CucumberParser
 from regressionanalyser.analyzer.api_analyzer import APIFailureAnalyzer
 from regressionanalyser.parser.output_parser import CustomOutputParser, FailureAnalysisResult
-from llm_wrappers.claude_llm_model import ClaudeModel
-
 from llm_wrappers.gemini_llm_model import GeminiModel
 from regressionanalyser.analyzer.ui_analyzer import UIFailureAnalyzer
 
@@ -32,8 +34,11 @@ try:
     output_parser = CustomOutputParser(pydantic_object=FailureAnalysisResult)
     llm = GeminiModel(model_name="gemini-2.0-flash", api_key=os.environ.get("GEMINI_API_KEY"))
     
-    ui_analyzer = UIFailureAnalyzer(llm=llm, batch_size=4, output_parser=output_parser)
-    api_analyzer = APIFailureAnalyzer(llm=llm, batch_size=4, output_parser=output_parser)
+    # One analyzer per report type, all sharing the same LLM client and parsers
+    analyzers = {
+        "ui": UIFailureAnalyzer(llm=llm, batch_size=4, input_parser=input_parser, output_parser=output_parser),
+        "api": APIFailureAnalyzer(llm=llm, batch_size=4, input_parser=input_parser, output_parser=output_parser),
+    }
     analysis_components_ready = True
 except ImportError as e:
     print(f"Warning: Missing analysis component import: {e}. Analysis endpoints may not function.")
@@ -51,6 +56,53 @@ app.mount("/static", StaticFiles(directory="dashboard/static"), name="static")
 # In-memory storage for results (will be overwritten on new uploads)
 current_results_data = []
 
+RESULTS_FILE = "results.json"
+results_adapter = TypeAdapter(List[FailureAnalysisResult])
+
+# Serialized JSON bodies per endpoint, keyed on the results.json mtime they were built from
+_response_cache: Dict[str, Tuple[Optional[int], bytes]] = {}
+
+def _results_mtime() -> Optional[int]:
+    try:
+        return os.stat(RESULTS_FILE).st_mtime_ns
+    except FileNotFoundError:
+        return None
+
+def _cached_json_response(key: str, build: Callable[[], Any]) -> Response:
+    """Serves build() as JSON, reusing the serialized body until results.json changes."""
+    mtime = _results_mtime()
+    cached = _response_cache.get(key)
+    if cached is None or cached[0] != mtime:
+        body = orjson.dumps(build())
+        cached = (mtime, body)
+        _response_cache[key] = cached
+    return Response(content=cached[1], media_type="application/json")
+
+def _write_results(payload: bytes) -> None:
+    """Writes results.json atomically so readers never see a truncated or half-written file."""
+    directory = os.path.dirname(os.path.abspath(RESULTS_FILE))
+    fd, tmp_path = tempfile.mkstemp(dir=directory, prefix=".results.", suffix=".tmp")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(payload)
+        # mkstemp creates the file as 0600; keep results.json readable like a regular write would
+        try:
+            mode = os.stat(RESULTS_FILE).st_mode & 0o777
+        except FileNotFoundError:
+            mode = 0o644
+        os.chmod(tmp_path, mode)
+        os.replace(tmp_path, RESULTS_FILE)
+    except BaseException:
+        os.unlink(tmp_path)
+        raise
+
+def _load_results() -> Optional[list]:
+    try:
+        with open(RESULTS_FILE, "rb") as f:
+            return orjson.loads(f.read())
+    except (FileNotFoundError, orjson.JSONDecodeError):
+        return None
+
 @app.post("/upload-cucumber-report/")
 async def upload_cucumber_report(file: UploadFile = File(...), report_type: str= Form("api")):
     logger.info(f"Received file upload: {file.filename}, type: {report_type}")
@@ -59,11 +111,10 @@ async def upload_cucumber_report(file: UploadFile = File(...), report_type: str=
         return JSONResponse(status_code=500, content={"message": "Analysis components not initialized."})
     try:
         contents = await file.read()
-        report_data = json.loads(contents)
-        if report_type == "ui":
-            results = ui_analyzer.analyzeReport(report_data)
-        else:
-            results = api_analyzer.analyzeReport(report_data)
+        report_data = orjson.loads(contents)
+        analyzer = analyzers.get(report_type, analyzers["api"])
+        # Async path so other requests keep being served while the LLM calls are in flight
+        results = await analyzer.aanalyzeReport(report_data)
 
         # Type check: handle string or error result
         if isinstance(results, str):
@@ -78,34 +129,24 @@ async def upload_cucumber_report(file: UploadFile = File(...), report_type: str=
                 flat_results.extend(r)
             else:
                 flat_results.append(r)
-        serializable_results = []
-        validation_errors = []
-        for item in flat_results:
-            try:
-                if hasattr(item, 'dict'):
-                    serializable_results.append(item.dict())
-                elif hasattr(item, 'model_dump'):
-                    serializable_results.append(item.model_dump())
-                elif isinstance(item, dict):
-                    serializable_results.append(item)
-                else:
-                    raise ValueError(f"Unexpected result type: {type(item)}")
-            except Exception as ve:
-                validation_errors.append(str(ve))
-
-        if validation_errors:
+        try:
+            # Validated and serialized by pydantic-core in one call each, not per item
+            validated_results = results_adapter.validate_python(flat_results)
+        except ValidationError as e:
+            validation_errors = [
+                f"{'.'.join(str(loc) for loc in error['loc'])}: {error['msg']}"
+                for error in e.errors(include_url=False)
+            ]
             logger.error(f"LLM response validation errors: {validation_errors}")
             return JSONResponse(status_code=500, content={
                 "message": "Some results could not be parsed or validated.",
                 "errors": validation_errors,
                 "raw_results": [str(item) for item in flat_results]
             })
-
-        with open("results.json", "w") as f:
-            json.dump(serializable_results, f, indent=2)
+        _write_results(results_adapter.dump_json(validated_results, indent=2))
 
         return JSONResponse(content={"message": "Report analyzed and results saved successfully!"})
-    except json.JSONDecodeError:
+    except orjson.JSONDecodeError:
         return JSONResponse(status_code=400, content={"message": "Invalid JSON file."})
     except Exception as e:
         logger.error(f"Error during report upload: {e}")
@@ -113,56 +154,60 @@ async def upload_cucumber_report(file: UploadFile = File(...), report_type: str=
 
 
 # Entry page now serves summary
-@app.get("/", response_class=HTMLResponse)
+@app.get("/")
 async def entry_page():
-    with open("dashboard/static/summary.html", "r") as f:
-        return HTMLResponse(content=f.read())
+    return FileResponse("dashboard/static/summary.html", media_type="text/html")
 
 # Details page
-@app.get("/details", response_class=HTMLResponse)
+@app.get("/details")
 async def get_details():
-    with open("dashboard/static/details.html", "r") as f:
-        return HTMLResponse(content=f.read())
+    return FileResponse("dashboard/static/details.html", media_type="text/html")
 
 @app.get("/api/results")
 async def get_results_data():
     """Provides the analyzed results as JSON."""
-    try:
-        with open("results.json", "r") as f:
-            data = json.load(f)
-    except (FileNotFoundError, json.JSONDecodeError):
-        data = []
-    return JSONResponse(content=data)
+    return _cached_json_response("results", lambda: _load_results() or [])
 
 
 # --- Summary Metrics Endpoint ---
 @app.get("/api/summary-metrics")
 async def get_summary_metrics():
-    try:
-        with open("results.json", "r") as f:
-            test_results = json.load(f)
-    except (FileNotFoundError, json.JSONDecodeError):
-        return JSONResponse(content={})
-
-    df = pd.DataFrame(test_results)
+    return _cached_json_response("summary-metrics", _build_summary_metrics)
+
+def _build_summary_metrics() -> Dict[str, Any]:
+    test_results = _load_results()
+    if test_results is None:
+        return {}
+
+    # Single pass over the results: feature, step and error pattern stats
+    feature_stats = Counter()
+    step_stats = defaultdict(lambda: {"count": 0, "features": set(), "files": set()})
+    error_patterns = defaultdict(lambda: {"count": 0, "features": set()})
+    for row in test_results:
+        # Interned so the repeated feature/error keys below compare by identity
+        feature = row.get("feature_name")
+        if isinstance(feature, str):
+            feature = sys.intern(feature)
+        if feature is not None:
+            feature_stats[feature] += 1
+
+        step = step_stats[row.get("step_details") or "Unknown Step"]
+        step["count"] += 1
+        step["features"].add(feature)
+        step["files"].add(row.get("file_path"))
+
+        error_type = sys.intern(str(row.get("error_message") or "Unknown Error").split(":", 1)[0] or "Unknown Error")
+        error = error_patterns[error_type]
+        error["count"] += 1
+        error["features"].add(feature)
 
     # Feature failure analysis
-    feature_stats = df.groupby(["feature_name"]).size()
     feature_failures = [
-        {"feature": feature, "failed": int(count)}
-        for feature, count in feature_stats.items()
+        {"feature": feature, "failed": count}
+        for feature, count in feature_stats.most_common()
     ]
-    feature_failures.sort(key=lambda x: x["failed"], reverse=True)
 
     # Step failure analysis
-    step_stats = {}
-    for _, row in df.iterrows():
-        step_key = row.get("step_details") or "Unknown Step"
-        if step_key not in step_stats:
-            step_stats[step_key] = {"count": 0, "features": set(), "files": set()}
-        step_stats[step_key]["count"] += 1
-        step_stats[step_key]["features"].add(row.get("feature_name"))
-        step_stats[step_key]["files"].add(row.get("file_path"))
     step_failures = [
         {
             "step": step,
@@ -177,13 +222,6 @@ async def get_summary_metrics():
     step_failures.sort(key=lambda x: x["count"], reverse=True)
 
     # Error pattern analysis
-    error_patterns = {}
-    for _, row in df.iterrows():
-        error_type = str(row.get("error_message", "Unknown Error")).split(":")[0] or "Unknown Error"
-        if error_type not in error_patterns:
-            error_patterns[error_type] = {"count": 0, "features": set()}
-        error_patterns[error_type]["count"] += 1
-        error_patterns[error_type]["features"].add(row.get("feature_name"))
     error_type_failures = [
         {
             "errorType": error,
@@ -194,16 +232,15 @@ async def get_summary_metrics():
     ]
     error_type_failures.sort(key=lambda x: x["count"], reverse=True)
 
-    return JSONResponse(content={
+    return {
         "featureFailures": feature_failures,
         "stepFailures": step_failures,
         "errorTypeFailures": error_type_failures
-    })
+    }
 
 # --- Serve summary.html ---
-@app.get("/summary", response_class=HTMLResponse)
+@app.get("/summary")
 async def get_summary():
-    with open("dashboard/static/summary.html", "r") as f:
-        return HTMLResponse(content=f.read())
+    return FileResponse("dashboard/static/summary.html", media_type="text/html")
     
     # To run this app: uvicorn dashboard.app:app --reload
\ No newline at end of file
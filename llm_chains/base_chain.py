@@ -1,15 +1,23 @@
-from concurrent.futures import ThreadPoolExecutor
-from pydantic import BaseModel
-from typing import List, Dict, Any
-from langchain_core.messages import HumanMessage
+import asyncio
+import orjson
+from pydantic import BaseModel, PrivateAttr
+from typing import List, Dict, Any, Optional
+from langchain_core.exceptions import OutputParserException
+from langchain_core.messages import BaseMessage, HumanMessage
 from langchain_core.output_parsers import PydanticOutputParser
 import time
 from langchain_core.prompts import PromptTemplate
+from langchain_core.runnables import Runnable, RunnableLambda
+from llm_chains.rate_limiter import RateLimiter
 
 import logging
 
 logger = logging.getLogger(__name__)
 
+class _RenderedItem(str):
+    """JSON text of an item already rendered by _create_batched_items; spliced into the prompt as-is."""
+    __slots__ = ()
+
 class BaseChain(BaseModel):
 
     llm: Any
@@ -17,21 +25,86 @@ class BaseChain(BaseModel):
     prompt_template: PromptTemplate
     batch_size: int = 25
     max_items_per_request: int = 5
-    delay_between_batches: int = 60
+    delay_between_batches_s: float = 0.0  # optional fixed pause between process_batch groups
+    rpm: Optional[int] = None  # requests per minute allowed by the provider; None disables throttling
+    tpm: Optional[int] = None  # tokens per minute allowed by the provider; None disables throttling
+    use_batch_api: bool = False  # send large async runs as one provider batch job (llm.abatch_job)
+    batch_api_threshold: int = 50  # minimum number of items before the batch API is used
+    items_variable: str = "items"  # prompt variable that receives the items of a request
+
+    _rate_limiter: Optional[RateLimiter] = PrivateAttr(default=None)
+    _format_instructions: str = PrivateAttr(default="")
+    _prompt: Optional[PromptTemplate] = PrivateAttr(default=None)
+    _llm_chain: Optional[Runnable] = PrivateAttr(default=None)
+    _chain: Optional[Runnable] = PrivateAttr(default=None)
+
+    def model_post_init(self, __context: Any) -> None:
+        # The format instructions only depend on the parser's schema, so render them
+        # once and bind them into the template instead of rebuilding them per request.
+        self._format_instructions = self.output_parser.get_format_instructions()
+        self._prompt = self.prompt_template
+        if "format_instructions" in self.prompt_template.input_variables:
+            self._prompt = self.prompt_template.partial(format_instructions=self._format_instructions)
+
+        if self.rpm or self.tpm:
+            if hasattr(self.llm, "request_limiter"):
+                # The LLM wrapper throttles each request itself and backs off on 429s,
+                # so every chain sharing this llm draws from the same budget. That budget
+                # is set once (here or by passing request_limiter to the llm); a chain asking
+                # for a different one is a configuration error, not something to ignore.
+                # LangChain's own llm.rate_limiter is left alone.
+                limiter = self.llm.request_limiter
+                if limiter is None:
+                    self.llm.request_limiter = RateLimiter(rpm=self.rpm, tpm=self.tpm)
+                elif (limiter.rpm, limiter.tpm) != (self.rpm, self.tpm):
+                    raise ValueError(
+                        f"llm already has a request_limiter with rpm={limiter.rpm}, tpm={limiter.tpm}; "
+                        f"this chain asked for rpm={self.rpm}, tpm={self.tpm}. Configure the budget once on the llm."
+                    )
+            else:
+                self._rate_limiter = RateLimiter(rpm=self.rpm, tpm=self.tpm)
+
+        # Compose the pipeline once; LangChain's batch/abatch handle pooling for it.
+        # _llm_chain takes prepared messages, so subclasses can inspect the prompt before sending it.
+        llm_chain = self.llm | self.output_parser
+        if self._rate_limiter:
+            llm_chain = RunnableLambda(self._throttle, afunc=self._athrottle) | llm_chain
+        self._llm_chain = llm_chain
+        self._chain = RunnableLambda(self._prepare_llm_input) | llm_chain
+
+    @staticmethod
+    def _estimate_tokens(messages: List[BaseMessage]) -> int:
+        return sum(len(str(m.content)) for m in messages) // 4
 
+    def _throttle(self, messages: List[BaseMessage]) -> List[BaseMessage]:
+        self._rate_limiter.acquire(self._estimate_tokens(messages))
+        return messages
 
-    def _prepare_llm_input(self, items: List[Dict[str, Any]]) -> List[HumanMessage]:
+    async def _athrottle(self, messages: List[BaseMessage]) -> List[BaseMessage]:
+        await self._rate_limiter.aacquire(self._estimate_tokens(messages))
+        return messages
+
+    def _prepare_llm_input(self, items: List[Any]) -> List[HumanMessage]:
         # Default implementation, can be overridden
-        prompt_text = self.prompt_template.format(items, self.output_parser.get_format_instructions())
+        prompt_text = self._prompt.format(**{self.items_variable: self._render_items(items)})
         return [HumanMessage(content=prompt_text)]
 
+    @staticmethod
+    def _render_item(item: Any) -> str:
+        return orjson.dumps(item, default=str).decode()
+
+    def _render_items(self, items: List[Any]) -> str:
+        """JSON array text for a request; items pre-rendered by _create_batched_items are used as-is."""
+        return "[" + ", ".join(item if isinstance(item, _RenderedItem) else self._render_item(item) for item in items) + "]"
+
     def process_single(self, item: Dict[str, Any]) -> Any:
-        chain = self._prepare_llm_input| self.llm | self.output_parser
-        return chain.invoke([item])
+        return self._chain.invoke([item])
     
     def _process_single_token_batch(self, token_batch: List[Dict[str, Any]]) -> List[Any]:
-        chain = self._prepare_llm_input| self.llm | self.output_parser
-        return chain.invoke(token_batch)
+        return self._chain.invoke(token_batch)
+
+    async def _aprocess_single_token_batch(self, token_batch: List[Dict[str, Any]]) -> List[Any]:
+        return await self._chain.ainvoke(token_batch)
 
     def process_batch(self, batch: List[Dict[str, Any]]) -> List[Any]:
         num_items = len(batch)
@@ -45,8 +118,10 @@ class BaseChain(BaseModel):
             batch_num = (i // batch_size) + 1
             logger.info(f"Processing batch {batch_num}/{num_batches} with {len(batch_items)} items.")
 
-            with ThreadPoolExecutor(max_workers=batch_size) as executor:
-                batch_results = list(executor.map(self.process_single, batch_items))
+            batch_results = self._chain.batch(
+                [[item] for item in batch_items],
+                config={"max_concurrency": batch_size}
+            )
             all_results.extend(batch_results)
 
             if batch_num < num_batches and self.delay_between_batches_s > 0:
@@ -57,11 +132,22 @@ class BaseChain(BaseModel):
         logger.info(f"Batch processing completed in {execution_time:.2f} seconds.")
         return all_results
     
+    async def aprocess_batch(self, batch: List[Dict[str, Any]]) -> List[Any]:
+        """Async variant of process_batch: one request per item, at most self.batch_size in flight."""
+        start_time = time.time()
+        results = await self._chain.abatch(
+            [[item] for item in batch],
+            config={"max_concurrency": self.batch_size}
+        )
+        execution_time = time.time() - start_time
+        logger.info(f"Async batch processing completed in {execution_time:.2f} seconds.")
+        return results
+
     def process_batched_items(self, items: List[Dict[str, Any]], max_chars: int = 200000) -> List[Any]:
         """
         Processes items in batches, each batch respecting token/character limits and max items per request.
         Each batch is sent as a single LLM request and results are aggregated.
-        Processes batches in groups of self.batch_size, with delay between groups.
+        Processes batches in groups of self.batch_size; pacing comes from the rpm/tpm limiter.
         """
         batches = self._create_batched_items(items, max_chars=max_chars)
         total_batches = len(batches)
@@ -74,40 +160,117 @@ class BaseChain(BaseModel):
             group_num = (group_idx // self.batch_size) + 1
             logger.info(f"Processing batch group {group_num}/{num_groups} with {len(group_batches)} sub-batches.")
 
-            with ThreadPoolExecutor(max_workers=len(group_batches)) as executor:
-                batch_results = list(executor.map(self._process_single_token_batch, group_batches))
-            for batch_result in batch_results:
-                if isinstance(batch_result, list):
-                    results.extend(batch_result)
-                else:
-                    results.append(batch_result)
-
-            if group_num < num_groups and getattr(self, "delay_between_batches_s", 0) > 0:
-                logger.info(f"Batch group {group_num} finished. Waiting for {self.delay_between_batches} seconds.")
-                time.sleep(self.delay_between_batches)
+            batch_results = self._chain.batch(group_batches, config={"max_concurrency": len(group_batches)})
+            self._collect_results(results, batch_results)
 
         execution_time = time.time() - start_time
         logger.info(f"Batched item processing completed in {execution_time:.2f} seconds.")
         return results
+
+    async def aprocess_batched_items(self, items: List[Dict[str, Any]], max_chars: int = 200000) -> List[Any]:
+        """
+        Async variant of process_batched_items.
+        All batches are dispatched at once on the event loop; a semaphore keeps at most
+        self.batch_size requests in flight and the rpm/tpm limiter replaces the fixed
+        delay between groups.
+        """
+        batches = self._create_batched_items(items, max_chars=max_chars)
+        if self.use_batch_api and len(items) >= self.batch_api_threshold and getattr(self.llm, "supports_batch_api", False):
+            return await self._aprocess_batch_job(batches)
+
+        semaphore = asyncio.Semaphore(self.batch_size)
+        start_time = time.time()
+        logger.info(f"Processing {len(batches)} sub-batches with up to {self.batch_size} in flight.")
+
+        async def run(token_batch: List[str]) -> List[Any]:
+            async with semaphore:
+                return await self._aprocess_single_token_batch(token_batch)
+
+        batch_results = await asyncio.gather(*(run(batch) for batch in batches))
+        results = []
+        self._collect_results(results, batch_results)
+
+        execution_time = time.time() - start_time
+        logger.info(f"Async batched item processing completed in {execution_time:.2f} seconds.")
+        return results
+
+    async def _aprocess_batch_job(self, batches: List[List[str]]) -> List[Any]:
+        """Submits every sub-batch in a single provider batch job and flattens the parsed responses."""
+        start_time = time.time()
+        batch_results = await self._abatch_job_results(batches)
+        results = []
+        self._collect_results(results, [result for result in batch_results if result is not None])
+
+        execution_time = time.time() - start_time
+        logger.info(f"Batch job with {len(batches)} requests completed in {execution_time:.2f} seconds.")
+        return results
+
+    async def _abatch_job_results(self, batches: List[List[str]]) -> List[Any]:
+        """
+        Returns the parsed result of each sub-batch by index (None for a dropped one).
+        Entries the job failed, or whose response does not parse, are retried one by one through
+        the regular request path so a single bad entry does not discard the whole job.
+        """
+        texts = await self.llm.abatch_job([self._prepare_llm_input(batch) for batch in batches])
+        batch_results: List[Any] = [None] * len(batches)
+        failed = []
+        for index, text in enumerate(texts):
+            if text is None:
+                failed.append(index)
+                continue
+            try:
+                batch_results[index] = self.output_parser.invoke(text)
+            except (OutputParserException, ValueError) as e:
+                # CustomOutputParser raises ValueError for invalid JSON, the stock parsers OutputParserException
+                logger.warning(f"Batch job response {index} could not be parsed: {e}")
+                failed.append(index)
+
+        if failed:
+            logger.info(f"Retrying {len(failed)} failed batch job requests individually.")
+            semaphore = asyncio.Semaphore(self.batch_size)
+
+            async def retry(index: int) -> None:
+                async with semaphore:
+                    try:
+                        batch_results[index] = await self._aprocess_single_token_batch(batches[index])
+                    except Exception as e:
+                        logger.error(f"Dropping sub-batch {index} of the batch job after its retry failed: {e}")
+
+            await asyncio.gather(*(retry(index) for index in failed))
+        return batch_results
+
+    @staticmethod
+    def _collect_results(results: List[Any], batch_results: List[Any]) -> None:
+        for batch_result in batch_results:
+            if isinstance(batch_result, list):
+                results.extend(batch_result)
+            else:
+                results.append(batch_result)
     
-    def _create_batched_items(self, items: List[Dict[str, Any]], max_chars: int = 200000) -> List[List[Dict[str, Any]]]:
+    def _create_batched_items(self, items: List[Dict[str, Any]], max_chars: int = 200000) -> List[List[str]]:
         """
         Groups items into batches, respecting both character count (token limit)
         and the maximum number of items per request.
+        Each item is rendered to JSON once; the batches hold that text so the
+        prompt does not serialize the items a second time.
         """
+        rendered_items = [_RenderedItem(self._render_item(item)) for item in items]
+        item_lengths = [len(rendered) for rendered in rendered_items]
+
+        # Everything fits in a single request
+        if len(items) <= self.max_items_per_request and sum(item_lengths) <= max_chars:
+            return [rendered_items] if rendered_items else []
+
         batches = []
         current_batch = []
         current_char_count = 0
         dropped_items = []
 
-        for idx, item in enumerate(items):
-            item_text = str(item)
-            item_chars = len(item_text)
-
+        for idx, (item_text, item_chars) in enumerate(zip(rendered_items, item_lengths)):
             # If item itself exceeds max_chars, drop and log it
             if item_chars > max_chars:
                 logger.warning(f"Item at index {idx} exceeds max_chars ({max_chars}) and will be dropped.")
-                dropped_items.append(item)
+                dropped_items.append(items[idx])
                 continue
 
             # Start a new batch if adding this item would exceed limits
@@ -118,7 +281,7 @@ class BaseChain(BaseModel):
                 current_batch = []
                 current_char_count = 0
 
-            current_batch.append(item)
+            current_batch.append(item_text)
             current_char_count += item_chars
 
         # Add any remaining items as a final batch
@@ -134,4 +297,3 @@ class BaseChain(BaseModel):
             logger.error(f"Batching logic error: {len(items) - total_in_batches - len(dropped_items)} items unaccounted for.")
 
         return batches
-  
@@ -0,0 +1,65 @@
+import asyncio
+import threading
+import time
+from typing import Optional
+
+import logging
+
+logger = logging.getLogger(__name__)
+
+class RateLimiter:
+    """
+    Token-bucket limiter enforcing requests-per-minute and tokens-per-minute budgets.
+    A thread lock guards the buckets, so a single instance can be shared by
+    sync callers (thread pools) and async callers across event loops.
+    Callers only wait when a bucket is empty instead of sleeping a fixed interval.
+    """
+
+    def __init__(self, rpm: Optional[int] = None, tpm: Optional[int] = None):
+        self.rpm = rpm
+        self.tpm = tpm
+        now = time.monotonic()
+        self._requests = float(rpm or 0)
+        self._tokens = float(tpm or 0)
+        self._updated = now
+        self._blocked_until = now
+        self._lock = threading.Lock()
+
+    def _reserve(self, tokens: int) -> float:
+        """Takes one request slot plus `tokens` and returns how long the caller must wait for them."""
+        with self._lock:
+            now = time.monotonic()
+            elapsed = now - self._updated
+            self._updated = now
+            wait_time = max(0.0, self._blocked_until - now)
+
+            if self.rpm:
+                rate = self.rpm / 60.0
+                self._requests = min(self.rpm, self._requests + elapsed * rate) - 1
+                if self._requests < 0:
+                    wait_time = max(wait_time, -self._requests / rate)
+
+            if self.tpm:
+                rate = self.tpm / 60.0
+                self._tokens = min(self.tpm, self._tokens + elapsed * rate) - tokens
+                if self._tokens < 0:
+                    wait_time = max(wait_time, -self._tokens / rate)
+
+            return wait_time
+
+    def acquire(self, tokens: int = 0) -> None:
+        wait_time = self._reserve(tokens)
+        if wait_time > 0:
+            logger.debug(f"Rate limit reached. Waiting {wait_time:.2f}s.")
+            time.sleep(wait_time)
+
+    async def aacquire(self, tokens: int = 0) -> None:
+        wait_time = self._reserve(tokens)
+        if wait_time > 0:
+            logger.debug(f"Rate limit reached. Waiting {wait_time:.2f}s.")
+            await asyncio.sleep(wait_time)
+
+    def penalize(self, seconds: float) -> None:
+        """Blocks every caller for `seconds`, e.g. from a 429 Retry-After header."""
+        with self._lock:
+            self._blocked_until = max(self._blocked_until, time.monotonic() + seconds)
@@ -1,17 +1,68 @@
 from abc import abstractmethod
+import asyncio
+import binascii
+import random
+import re
 import time
-import requests
-from typing import Any, Dict, List, Optional, Tuple
-from requests.exceptions import RequestException, HTTPError
+import httpx
+import orjson
+from typing import Any, AsyncIterator, ClassVar, Dict, Iterable, Iterator, List, Optional, Tuple, Union
+from langchain_core.callbacks import AsyncCallbackManagerForLLMRun, CallbackManagerForLLMRun
 from langchain_core.language_models.chat_models import BaseChatModel
-from langchain_core.outputs import ChatResult, ChatGeneration
-from langchain_core.messages import AIMessage
+from langchain_core.outputs import ChatResult, ChatGeneration, ChatGenerationChunk
+from langchain_core.messages import AIMessage, AIMessageChunk
 import logging
-from langchain_core.messages import BaseMessage, HumanMessage
-from pydantic import BaseModel
+from langchain_core.messages import BaseMessage, HumanMessage, SystemMessage
+from pydantic import BaseModel, PrivateAttr
+from llm_chains.rate_limiter import RateLimiter
+from llm_wrappers.response_cache import ResponseCache
+from llm_wrappers.semantic_cache import SemanticCache
+
+try:
+    # Incremental JSON parser; without it responses are buffered and decoded with orjson
+    import ijson
+except ImportError:
+    ijson = None
+
+try:
+    # SIMD base64 (AVX2/NEON); falls back to the stdlib implementation
+    from pybase64 import b64decode, b64encode_as_string
+except ImportError:
+    from base64 import b64decode, b64encode
+
+    def b64encode_as_string(data: bytes) -> str:
+        return b64encode(data).decode("ascii")
 
 logger = logging.getLogger(__name__)
 
+# Rate limits and transient gateway errors; anything else is raised immediately
+RETRYABLE_STATUS_CODES = (429, 502, 503, 504)
+
+_DATA_URL_RE = re.compile(r"data:image/[\w.+-]+;base64,")
+
+async def _close_on_cancel(client: httpx.AsyncClient) -> None:
+    """
+    Parks until cancelled, then closes the client on the loop that owns its connections.
+    asyncio.run cancels leftover tasks before closing the loop, so each asyncio.run call
+    (e.g. the sync run() wrappers) releases its pool instead of leaking it.
+    """
+    try:
+        await asyncio.get_running_loop().create_future()
+    finally:
+        await client.aclose()
+
+def _build_client() -> httpx.Client:
+    """
+    Keep-alive HTTP/2 client so TLS handshakes are paid once per host, not once per prompt,
+    and concurrent thread-pool requests multiplex over the same connection.
+    httpx.Client is thread-safe; retries are handled by _process_messages_with_retry.
+    """
+    return httpx.Client(
+        http2=True,
+        timeout=httpx.Timeout(60.0, connect=10.0),
+        limits=httpx.Limits(max_connections=64, max_keepalive_connections=32)
+    )
+
 class BaseCustomModelLLM(BaseChatModel, BaseModel):
     """Base class for any custom LLM (Claude, Gemini, etc.) that calls a custom API.
     
@@ -23,12 +74,48 @@ class BaseCustomModelLLM(BaseChatModel, BaseModel):
     model_name: str
     api_key: str
     max_retries: int = 3
+    max_backoff: float = 60.0 # Upper bound in seconds for a single retry wait
     timeout: int = 60 # Set a default timeout for API requests
+    # Shared RPM/TPM budget; every request waits on it. Named apart from LangChain's own
+    # BaseChatModel.rate_limiter, which is acquired with a different signature.
+    request_limiter: Optional[RateLimiter] = None
+    # Returns stored responses for near-identical prompts. Named apart from LangChain's
+    # BaseLanguageModel.cache, which only accepts a langchain BaseCache.
+    semantic_cache: Optional[SemanticCache] = None
+    response_cache: Optional[ResponseCache] = None # Exact-match LRU checked before the semantic cache
+    batch_poll_interval: float = 10.0 # Initial wait between batch job status checks, doubled up to the max
+    batch_poll_max_interval: float = 300.0
+    batch_timeout: float = 24 * 60 * 60 # Providers expire batch jobs after 24h
+    # Static system text sent ahead of every request's own system prompts. Keeping it
+    # byte-identical across calls lets the provider reuse the cached prefix.
+    system_blocks: List[str] = []
+    # Ask for the provider's low-latency mode where it has one (see the model's _build_request)
+    latency_optimized: bool = False
 
     # Use pydantic to enforce these types and make the class configurable
     # You can also add other optional parameters like `temperature` or `max_tokens`
     # and pass them down to the payload.
 
+    # Set by models that implement _build_batch_request/_poll_batch; BaseChain only uses abatch_job then.
+    supports_batch_api: ClassVar[bool] = False
+    # Shared by every model instance; headers are passed per request since they carry each model's API key.
+    _client: ClassVar[httpx.Client] = _build_client()
+    # ijson prefix of the response text (e.g. "content.item.text"); set by models whose
+    # text lives at a single path so it can be read while the body is still streaming.
+    _stream_text_prefix: ClassVar[Optional[str]] = None
+    # Message class -> handler method name for _dispatch_messages. LangChain message
+    # classes are concrete, so an exact type lookup replaces an isinstance chain.
+    _message_handlers: ClassVar[Dict[type, str]] = {
+        SystemMessage: "_handle_system",
+        HumanMessage: "_handle_human",
+        AIMessage: "_handle_ai",
+    }
+    # httpx.AsyncClient pools connections per event loop, so it is created lazily
+    # and recreated if the model is reused from a different loop.
+    _async_client: Optional[httpx.AsyncClient] = PrivateAttr(default=None)
+    _async_client_loop: Optional[asyncio.AbstractEventLoop] = PrivateAttr(default=None)
+    # Task that closes _async_client when it is cancelled (see _close_on_cancel)
+    _async_client_closer: Optional[asyncio.Task] = PrivateAttr(default=None)
 
     @property
     def _llm_type(self) -> str:
@@ -40,33 +127,57 @@ class BaseCustomModelLLM(BaseChatModel, BaseModel):
         stop: Optional[List[str]] = None,
         **kwargs: Any,
     ) -> ChatResult:
-        text = self._process_messages_with_retry(messages, stop=stop, **kwargs)
-        return ChatResult(generations=[ChatGeneration(message=AIMessage(content=text))])
+        key, result = self._response_cache_lookup(messages, stop=stop, **kwargs)
+        if result is not None:
+            return self._to_chat_result(result)
+        text, embedding = self._cache_lookup(messages, **kwargs)
+        if text is None:
+            text = self._process_messages_with_retry(messages, stop=stop, **kwargs)
+            self._cache_store(embedding, text)
+        if key is not None:
+            self.response_cache.put(key, text)
+        return self._to_chat_result(text)
+
+    @staticmethod
+    def _to_chat_result(result: Union[str, AIMessage]) -> ChatResult:
+        message = result if isinstance(result, AIMessage) else AIMessage(content=result)
+        return ChatResult(generations=[ChatGeneration(message=message)])
 
-    def _process_messages_with_retry(self, messages: List[BaseMessage], **kwargs: Any) -> str:
+    def _process_messages_with_retry(self, messages: List[BaseMessage], **kwargs: Any) -> Union[str, AIMessage]:
+        # Built and encoded once, so images are cleaned once per request rather than per attempt;
+        # orjson encodes the payload (and any base64 images in it) in one C pass
+        url, payload = self._build_request(messages, **kwargs)
+        content = orjson.dumps(payload)
         for attempt in range(self.max_retries):
             try:
-                url, payload = self._build_request(messages, **kwargs)
-                response = requests.post(
+                if self.request_limiter:
+                    self.request_limiter.acquire(self._estimate_tokens(messages))
+                with self._client.stream(
+                    "POST",
                     url,
                     headers=self._get_headers(),
-                    json=payload,
+                    content=content,
                     timeout=self.timeout
-                )
-                response.raise_for_status()
-                return self._parse_response(response.json())
-            except HTTPError as e:
-                if e.response is not None and e.response.status_code == 429 and attempt < self.max_retries - 1:
-                    wait_time = 2 ** attempt
-                    logger.warning(f"Rate limit exceeded. Retrying in {wait_time}s...")
-                    time.sleep(wait_time)
+                ) as response:
+                    response.raise_for_status()
+                    return self._read_response(response, stream_text=not kwargs.get("tools"))
+            except httpx.HTTPStatusError as e:
+                status = e.response.status_code
+                if status in RETRYABLE_STATUS_CODES and attempt < self.max_retries - 1:
+                    wait_time = self._backoff_delay(attempt, e.response.headers)
+                    logger.warning(f"HTTP {status} from API. Retrying in {wait_time:.1f}s...")
+                    if status == 429 and self.request_limiter:
+                        # Hold back every request sharing the limiter, including this retry
+                        self.request_limiter.penalize(wait_time)
+                    else:
+                        time.sleep(wait_time)
                 else:
                     logger.error(f"HTTPError on attempt {attempt + 1}: {e}")
                     raise
-            except RequestException as e:
-                logger.error(f"RequestException on attempt {attempt + 1}: {e}")
+            except httpx.RequestError as e:
+                logger.error(f"RequestError on attempt {attempt + 1}: {e}")
                 if attempt < self.max_retries - 1:
-                    time.sleep(1)
+                    time.sleep(self._backoff_delay(attempt))
                 else:
                     raise
             except Exception as e:
@@ -74,6 +185,299 @@ class BaseCustomModelLLM(BaseChatModel, BaseModel):
                 raise
         raise ConnectionError(f"Failed to get a response after {self.max_retries} attempts.")
 
+    def _read_response(self, response: httpx.Response, stream_text: bool = True) -> Union[str, AIMessage]:
+        """
+        Extracts the response text, parsing the body incrementally while it streams in when possible.
+        Requests with tools are read whole, since the reply may be tool calls rather than text.
+        """
+        if not stream_text or self._stream_text_prefix is None or ijson is None:
+            return self._parse_response(orjson.loads(response.read()))
+        reader = _StreamTextReader(self._stream_text_prefix)
+        for chunk in response.iter_bytes():
+            reader.feed(chunk)
+        return reader.text()
+
+    async def _aread_response(self, response: httpx.Response, stream_text: bool = True) -> Union[str, AIMessage]:
+        if not stream_text or self._stream_text_prefix is None or ijson is None:
+            return self._parse_response(orjson.loads(await response.aread()))
+        reader = _StreamTextReader(self._stream_text_prefix)
+        async for chunk in response.aiter_bytes():
+            reader.feed(chunk)
+        return reader.text()
+
+    @property
+    def async_client(self) -> httpx.AsyncClient:
+        """Shared HTTP/2 keep-alive client for the current event loop."""
+        loop = asyncio.get_running_loop()
+        if self._async_client is None or self._async_client_loop is not loop:
+            old_loop, old_closer = self._async_client_loop, self._async_client_closer
+            if old_closer is not None and not old_loop.is_closed():
+                # The previous loop is still alive (another thread): close its pool there
+                old_loop.call_soon_threadsafe(old_closer.cancel)
+            self._async_client = httpx.AsyncClient(
+                http2=True,
+                timeout=self.timeout,
+                limits=httpx.Limits(max_connections=64, max_keepalive_connections=32)
+            )
+            self._async_client_loop = loop
+            self._async_client_closer = loop.create_task(_close_on_cancel(self._async_client))
+        return self._async_client
+
+    async def _agenerate(
+        self,
+        messages: List[BaseMessage],
+        stop: Optional[List[str]] = None,
+        **kwargs: Any,
+    ) -> ChatResult:
+        key, result = self._response_cache_lookup(messages, stop=stop, **kwargs)
+        if result is not None:
+            return self._to_chat_result(result)
+        text, embedding = None, None
+        if self.semantic_cache is not None:
+            # Loading and running the embedding model is CPU-bound; keep it off the event loop
+            text, embedding = await asyncio.to_thread(self._cache_lookup, messages, **kwargs)
+        if text is None:
+            text = await self._aprocess_messages_with_retry(messages, stop=stop, **kwargs)
+            self._cache_store(embedding, text)
+        if key is not None:
+            self.response_cache.put(key, text)
+        return self._to_chat_result(text)
+
+    async def _aprocess_messages_with_retry(self, messages: List[BaseMessage], **kwargs: Any) -> Union[str, AIMessage]:
+        """Async counterpart of `_process_messages_with_retry`; requests share one event loop."""
+        url, payload = self._build_request(messages, **kwargs)
+        content = orjson.dumps(payload)
+        for attempt in range(self.max_retries):
+            try:
+                if self.request_limiter:
+                    await self.request_limiter.aacquire(self._estimate_tokens(messages))
+                async with self.async_client.stream(
+                    "POST",
+                    url,
+                    headers=self._get_headers(),
+                    content=content
+                ) as response:
+                    response.raise_for_status()
+                    return await self._aread_response(response, stream_text=not kwargs.get("tools"))
+            except httpx.HTTPStatusError as e:
+                status = e.response.status_code
+                if status in RETRYABLE_STATUS_CODES and attempt < self.max_retries - 1:
+                    wait_time = self._backoff_delay(attempt, e.response.headers)
+                    logger.warning(f"HTTP {status} from API. Retrying in {wait_time:.1f}s...")
+                    if status == 429 and self.request_limiter:
+                        self.request_limiter.penalize(wait_time)
+                    else:
+                        await asyncio.sleep(wait_time)
+                else:
+                    logger.error(f"HTTPError on attempt {attempt + 1}: {e}")
+                    raise
+            except httpx.RequestError as e:
+                logger.error(f"RequestError on attempt {attempt + 1}: {e}")
+                if attempt < self.max_retries - 1:
+                    await asyncio.sleep(self._backoff_delay(attempt))
+                else:
+                    raise
+            except Exception as e:
+                logger.exception(f"Unexpected error on attempt {attempt + 1}: {e}")
+                raise
+        raise ConnectionError(f"Failed to get a response after {self.max_retries} attempts.")
+
+    def _stream(
+        self,
+        messages: List[BaseMessage],
+        stop: Optional[List[str]] = None,
+        run_manager: Optional[CallbackManagerForLLMRun] = None,
+        **kwargs: Any,
+    ) -> Iterator[ChatGenerationChunk]:
+        """
+        Yields the response as it is generated (server-sent events). Models without a
+        streaming endpoint yield the whole response as one chunk. A response cache hit is
+        yielded as one chunk; a stream read to the end is stored in the response cache.
+        Streams are not retried, since part of the output may already have been consumed.
+        """
+        request = self._build_stream_request(messages, stop=stop, **kwargs)
+        if request is None:
+            yield self._result_chunk(self._generate(messages, stop=stop, **kwargs))
+            return
+        key, result = self._response_cache_lookup(messages, stop=stop, **kwargs)
+        if result is not None:
+            chunk = self._result_chunk(self._to_chat_result(result))
+            if run_manager:
+                run_manager.on_llm_new_token(chunk.message.content, chunk=chunk)
+            yield chunk
+            return
+        url, payload = request
+        if self.request_limiter:
+            self.request_limiter.acquire(self._estimate_tokens(messages))
+        streamed = None
+        with self._client.stream(
+            "POST", url, headers=self._get_headers(), content=orjson.dumps(payload), timeout=self.timeout
+        ) as response:
+            response.raise_for_status()
+            for line in response.iter_lines():
+                message_chunk = self._parse_sse_line(line)
+                if message_chunk is not None:
+                    streamed = message_chunk if streamed is None else streamed + message_chunk
+                    chunk = ChatGenerationChunk(message=message_chunk)
+                    if run_manager:
+                        run_manager.on_llm_new_token(message_chunk.content, chunk=chunk)
+                    yield chunk
+        self._response_cache_store(key, streamed)
+
+    async def _astream(
+        self,
+        messages: List[BaseMessage],
+        stop: Optional[List[str]] = None,
+        run_manager: Optional[AsyncCallbackManagerForLLMRun] = None,
+        **kwargs: Any,
+    ) -> AsyncIterator[ChatGenerationChunk]:
+        request = self._build_stream_request(messages, stop=stop, **kwargs)
+        if request is None:
+            yield self._result_chunk(await self._agenerate(messages, stop=stop, **kwargs))
+            return
+        key, result = self._response_cache_lookup(messages, stop=stop, **kwargs)
+        if result is not None:
+            chunk = self._result_chunk(self._to_chat_result(result))
+            if run_manager:
+                await run_manager.on_llm_new_token(chunk.message.content, chunk=chunk)
+            yield chunk
+            return
+        url, payload = request
+        if self.request_limiter:
+            await self.request_limiter.aacquire(self._estimate_tokens(messages))
+        streamed = None
+        async with self.async_client.stream(
+            "POST", url, headers=self._get_headers(), content=orjson.dumps(payload)
+        ) as response:
+            response.raise_for_status()
+            async for line in response.aiter_lines():
+                message_chunk = self._parse_sse_line(line)
+                if message_chunk is not None:
+                    streamed = message_chunk if streamed is None else streamed + message_chunk
+                    chunk = ChatGenerationChunk(message=message_chunk)
+                    if run_manager:
+                        await run_manager.on_llm_new_token(message_chunk.content, chunk=chunk)
+                    yield chunk
+        self._response_cache_store(key, streamed)
+
+    def _parse_sse_line(self, line: str) -> Optional[AIMessageChunk]:
+        if not line.startswith("data:"):
+            return None
+        data = line[5:].strip()
+        if not data or data == "[DONE]":
+            return None
+        return self._parse_stream_event(orjson.loads(data))
+
+    @staticmethod
+    def _result_chunk(result: ChatResult) -> ChatGenerationChunk:
+        """Wraps a complete response as a single stream chunk, keeping any tool calls."""
+        message = result.generations[0].message
+        return ChatGenerationChunk(message=AIMessageChunk(
+            content=message.content,
+            tool_call_chunks=[
+                {"name": tool_call["name"], "args": orjson.dumps(tool_call["args"]).decode(), "id": tool_call["id"], "index": index}
+                for index, tool_call in enumerate(getattr(message, "tool_calls", None) or ())
+            ]
+        ))
+
+    def _build_stream_request(self, messages: List[BaseMessage], **kwargs: Any) -> Optional[Tuple[str, dict]]:
+        """Builds the streaming variant of the request, or None if the model does not stream."""
+        return None
+
+    def _parse_stream_event(self, event: dict) -> Optional[AIMessageChunk]:
+        """Default for APIs whose events are partial responses in the regular format."""
+        text = self._parse_response(event)
+        return AIMessageChunk(content=text) if text else None
+
+    async def abatch_job(self, message_lists: List[List[BaseMessage]]) -> List[Optional[str]]:
+        """
+        Sends all prompts as a single provider batch job (one upload, poll, collect)
+        and returns the response texts in the same order as `message_lists`.
+        Entries the provider did not complete are None.
+        """
+        url, payload = self._build_batch_request(message_lists)
+        response = await self.async_client.post(url, headers=self._get_headers(), content=orjson.dumps(payload))
+        response.raise_for_status()
+        job = orjson.loads(response.content)
+        logger.info(f"Submitted batch job with {len(message_lists)} requests.")
+
+        interval = self.batch_poll_interval
+        deadline = time.monotonic() + self.batch_timeout
+        while True:
+            texts = await self._poll_batch(job, len(message_lists))
+            if texts is not None:
+                return texts
+            if time.monotonic() > deadline:
+                raise TimeoutError(f"Batch job did not finish within {self.batch_timeout}s.")
+            logger.info(f"Batch job still running. Checking again in {interval}s.")
+            await asyncio.sleep(interval)
+            interval = min(interval * 2, self.batch_poll_max_interval)
+
+    def _build_batch_request(self, message_lists: List[List[BaseMessage]]) -> Tuple[str, dict]:
+        """Builds the batch job creation request. Override in models whose API supports batches."""
+        raise NotImplementedError(f"{type(self).__name__} does not support batch jobs.")
+
+    async def _poll_batch(self, job: dict, count: int) -> Optional[List[Optional[str]]]:
+        """Returns the `count` response texts (None for failed entries) once the job has finished, otherwise None."""
+        raise NotImplementedError(f"{type(self).__name__} does not support batch jobs.")
+
+    def _response_cache_lookup(self, messages: List[BaseMessage], **kwargs: Any) -> Tuple[Optional[bytes], Any]:
+        """Returns (key, cached result); the key is None when the response cache is off or skips this call."""
+        if self.response_cache is None:
+            return None, None
+        key = self.response_cache.make_key(self.model_name, self.get_messages(messages), kwargs)
+        if key is None:
+            return None, None
+        return key, self.response_cache.get(key)
+
+    def _response_cache_store(self, key: Optional[bytes], streamed: Optional[AIMessageChunk]) -> None:
+        """Stores a fully read stream, assembled into the same str / AIMessage form _generate caches."""
+        if key is None or streamed is None:
+            return
+        if streamed.tool_calls:
+            self.response_cache.put(key, AIMessage(content=streamed.content, tool_calls=streamed.tool_calls))
+        else:
+            self.response_cache.put(key, streamed.content)
+
+    def clear_cache(self) -> None:
+        """Drops every stored response from the exact and semantic caches."""
+        if self.response_cache is not None:
+            self.response_cache.clear_cache()
+        if self.semantic_cache is not None:
+            self.semantic_cache.clear()
+
+    def _cache_lookup(self, messages: List[BaseMessage], **kwargs: Any) -> Tuple[Optional[str], Any]:
+        """Returns (cached response, prompt embedding). Prompts carrying images or tools are never cached."""
+        if self.semantic_cache is None or kwargs.get("tools"):
+            return None, None
+        messages = self.get_messages(messages)
+        if any(m.additional_kwargs.get("images") for m in messages):
+            return None, None
+        embedding = self.semantic_cache.embed("\n".join(f"{m.type}: {m.content}" for m in messages))
+        return self.semantic_cache.lookup(embedding, namespace=self.model_name), embedding
+
+    def _cache_store(self, embedding: Any, text: Union[str, AIMessage]) -> None:
+        if embedding is not None and text and isinstance(text, str):
+            self.semantic_cache.put(embedding, text, namespace=self.model_name)
+
+    def _estimate_tokens(self, messages: List[BaseMessage]) -> int:
+        """Rough prompt size for the TPM budget (~4 characters per token)."""
+        return sum(len(str(m.content)) for m in self.get_messages(messages)) // 4
+
+    def _backoff_delay(self, attempt: int, headers: Any = None) -> float:
+        """Retry-After when the server sends one, otherwise exponential backoff with jitter; both capped at max_backoff."""
+        retry_after = self._retry_after(headers) if headers is not None else None
+        if retry_after is not None:
+            return min(max(retry_after, 0.0), self.max_backoff)
+        return min(self.max_backoff, 2 ** attempt + random.uniform(0, 1))
+
+    @staticmethod
+    def _retry_after(headers: Any) -> Optional[float]:
+        value = headers.get("Retry-After")
+        try:
+            return float(value) if value else None
+        except ValueError:
+            return None
 
     @abstractmethod
     def _get_headers(self) -> Dict[str, str]:
@@ -84,10 +488,51 @@ class BaseCustomModelLLM(BaseChatModel, BaseModel):
         pass
 
     @abstractmethod
-    def _parse_response(self, response_json: dict) -> str:
+    def _parse_response(self, response_json: dict) -> Union[str, AIMessage]:
+        """Returns the response text, or a full AIMessage when the reply carries tool calls."""
         pass
     
 
+    def _dispatch_messages(self, messages: List[BaseMessage]) -> Tuple[List[str], List[Dict[str, Any]]]:
+        """
+        Converts messages to the provider format. Returns (system prompts, provider messages);
+        each handler appends to one of the two lists.
+        """
+        system_prompts: List[str] = list(self.system_blocks)
+        provider_messages: List[Dict[str, Any]] = []
+        handlers = self._message_handlers
+        for message in self.get_messages(messages):
+            handler = handlers.get(type(message)) or self._resolve_handler(type(message))
+            if handler is None:
+                logger.warning(f"Unsupported message type: {type(message)}")
+            else:
+                getattr(self, handler)(message, system_prompts, provider_messages)
+        return system_prompts, provider_messages
+
+    @classmethod
+    def _resolve_handler(cls, message_type: type) -> Optional[str]:
+        """
+        Finds the handler of the nearest registered base class (e.g. AIMessageChunk -> AIMessage,
+        as produced by _stream) and caches it under the concrete type for later lookups.
+        """
+        for base in message_type.__mro__[1:]:
+            handler = cls._message_handlers.get(base)
+            if handler is not None:
+                cls._message_handlers[message_type] = handler
+                return handler
+        return None
+
+    def _handle_system(self, message: SystemMessage, system_prompts: List[str], provider_messages: List[Dict[str, Any]]) -> None:
+        """Default: collect the system prompt for the provider's dedicated system field."""
+        if message.content:
+            system_prompts.append(message.content.strip())
+
+    def _handle_human(self, message: HumanMessage, system_prompts: List[str], provider_messages: List[Dict[str, Any]]) -> None:
+        raise NotImplementedError
+
+    def _handle_ai(self, message: AIMessage, system_prompts: List[str], provider_messages: List[Dict[str, Any]]) -> None:
+        raise NotImplementedError
+
     def get_messages(self, messages: List[BaseMessage]) -> List[BaseMessage]:
         if isinstance(messages, str):
             return [HumanMessage(content=messages)]
@@ -97,5 +542,49 @@ class BaseCustomModelLLM(BaseChatModel, BaseModel):
 
     @staticmethod
     def clean_base64(base64_string: str) -> str:
-        return base64_string.strip().replace('\n',"")
+        """Strips any data URL prefix and line breaks and returns validated base64."""
+        data = base64_string.strip()
+        # Plain base64 (what the parsers store) never starts with "data:", so the regex only runs for data URLs
+        if data.startswith("data:"):
+            match = _DATA_URL_RE.match(data)
+            data = data[match.end():] if match else data.partition(",")[2]
+        data = data.replace('\n',"")
+        try:
+            b64decode(data, validate=True)
+        except (binascii.Error, ValueError):
+            try:
+                # Stray whitespace or non-alphabet characters: decode leniently and re-encode canonically
+                data = b64encode_as_string(b64decode(data))
+            except (binascii.Error, ValueError):
+                # Not repairable (e.g. bad padding); send the stripped text and let the provider reject that one image
+                logger.warning("Image is not valid base64; sending it without validation.")
+        return data
     
+
+
+class _StreamTextReader:
+    """
+    Push-parses a JSON body chunk by chunk and keeps the first string found at `prefix`.
+    Chunks after the hit are only read, not parsed, so the connection is drained back to the pool.
+    """
+
+    def __init__(self, prefix: str):
+        self._found = ijson.sendable_list()
+        self._parser = ijson.items_coro(self._found, prefix)
+        self._text: Optional[str] = None
+
+    def feed(self, chunk: bytes) -> None:
+        if self._text is not None:
+            return
+        self._parser.send(chunk)
+        self._take(self._found)
+
+    def text(self) -> str:
+        if self._text is None:
+            self._parser.close()
+            self._take(self._found)
+        return self._text or ""
+
+    def _take(self, items: Iterable[Any]) -> None:
+        self._text = next((item for item in items if isinstance(item, str)), None)
+        del self._found[:]
@@ -1,7 +1,8 @@
+import orjson
 import logging
-from typing import Any, Dict, List, Tuple
+from typing import Any, ClassVar, Dict, List, Optional, Tuple
 
-from langchain_core.messages import HumanMessage, SystemMessage, AIMessage, BaseMessage
+from langchain_core.messages import HumanMessage, AIMessage, AIMessageChunk, BaseMessage
 
 from llm_wrappers.base_custom_model_llm import BaseCustomModelLLM
 from llm_wrappers.config import CLAUDE_API_BASE_URL
@@ -15,6 +16,8 @@ class ClaudeModel(BaseCustomModelLLM):
     """
 
     api_base_url : str = CLAUDE_API_BASE_URL
+    _stream_text_prefix: ClassVar[Optional[str]] = "content.item.text"
+    supports_batch_api: ClassVar[bool] = True
    
     def _get_headers(self) -> Dict[str, str]:
         """Provides the common headers for the API request."""
@@ -27,34 +30,74 @@ class ClaudeModel(BaseCustomModelLLM):
     
     def _build_request(self, messages: List[BaseMessage], **kwargs) -> Tuple[str, dict]:
         url = self.api_base_url
-        claude_messages = self._process_messages(messages)
+        system_prompts, claude_messages = self._process_messages(messages)
 
-        return url, {
+        payload = {
             "messages": claude_messages,
             "model": self.model_name,
             "max_tokens": 4096
         }
+        if system_prompts:
+            system_blocks = [{"type": "text", "text": prompt} for prompt in system_prompts]
+            # The system prompt is identical across requests; mark it so the API caches the prefix
+            system_blocks[-1]["cache_control"] = {"type": "ephemeral"}
+            payload["system"] = system_blocks
+        return url, payload
 
-    def _process_messages(self, messages: List[BaseMessage]) -> List[Dict[str, str]]:
-        claude_messages = []
-        system_prompt = None
-        for message in self.get_messages(messages):
-            if isinstance(message, SystemMessage):
-                system_prompt = message.content.strip()
-                claude_messages.append({"role": "system", "content": system_prompt})
-            elif isinstance(message, HumanMessage):
-                text = message.content.strip()
-                if system_prompt:
-                    text = f"{system_prompt}\n{text}"
-                    system_prompt = None
-                claude_messages.append({"role": "user", "content": text})
-            elif isinstance(message, AIMessage):
-                claude_messages.append({"role": "assistant", "content": message.content.strip()})
+    def _build_stream_request(self, messages: List[BaseMessage], **kwargs) -> Optional[Tuple[str, dict]]:
+        url, payload = self._build_request(messages, **kwargs)
+        payload["stream"] = True
+        return url, payload
+
+    def _parse_stream_event(self, event: Dict[str, Any]) -> Optional[AIMessageChunk]:
+        """Only text deltas carry output; message_start, ping, stop events are skipped."""
+        if event.get("type") != "content_block_delta":
+            return None
+        delta = event.get("delta") or {}
+        text = delta.get("text") if delta.get("type") == "text_delta" else None
+        return AIMessageChunk(content=text) if text else None
+
+    def _build_batch_request(self, message_lists: List[List[BaseMessage]]) -> Tuple[str, dict]:
+        """Message Batches API: each prompt becomes one request keyed by its index."""
+        return self.api_base_url + "/batches", {
+            "requests": [
+                {"custom_id": str(index), "params": self._build_request(messages)[1]}
+                for index, messages in enumerate(message_lists)
+            ]
+        }
+
+    async def _poll_batch(self, job: dict, count: int) -> Optional[List[Optional[str]]]:
+        status = await self.async_client.get(f"{self.api_base_url}/batches/{job['id']}", headers=self._get_headers())
+        status.raise_for_status()
+        status_json = orjson.loads(status.content)
+        if status_json.get("processing_status") != "ended":
+            return None
+
+        results = await self.async_client.get(status_json["results_url"], headers=self._get_headers())
+        results.raise_for_status()
+        texts: List[Optional[str]] = [None] * count
+        for line in results.content.splitlines():
+            if not line.strip():
+                continue
+            entry = orjson.loads(line)
+            result = entry.get("result", {})
+            if result.get("type") == "succeeded":
+                texts[int(entry["custom_id"])] = self._parse_response(result["message"])
             else:
-                logger.warning(f"Unsupported message type: {type(message)}")
-        return claude_messages
-    
-    def _process_human_message(self, message: HumanMessage, system_prompt: str = "") -> Dict[str, Any]:
+                logger.warning(f"Batch request {entry.get('custom_id')} did not succeed: {result}")
+        return texts
+
+    def _process_messages(self, messages: List[BaseMessage]) -> Tuple[List[str], List[Dict[str, Any]]]:
+        """Returns (system prompts, messages); Claude takes the system prompt as a top-level field."""
+        return self._dispatch_messages(messages)
+
+    def _handle_human(self, message: HumanMessage, system_prompts: List[str], claude_messages: List[Dict[str, Any]]) -> None:
+        claude_messages.append(self._process_human_message(message))
+
+    def _handle_ai(self, message: AIMessage, system_prompts: List[str], claude_messages: List[Dict[str, Any]]) -> None:
+        claude_messages.append({"role": "assistant", "content": message.content.strip()})
+
+    def _process_human_message(self, message: HumanMessage) -> Dict[str, Any]:
         content = [{"type": "text", "text": message.content.strip()}]
         if hasattr(message, 'additional_kwargs') and 'images' in message.additional_kwargs:
             content.extend(self._process_images(message.additional_kwargs['images']))
@@ -65,16 +108,17 @@ class ClaudeModel(BaseCustomModelLLM):
         }
     
     def _process_images(self, images: List[str]) -> List[Dict[str, Any]]:
+        # clean_base64 strips the (multi-MB) string once; blank screenshots come back empty and are skipped
         return [
             {
                 "type": "image",
                 "source": {
                     "type": "base64",
-                    "data": self.clean_base64(image),
+                    "data": data,
                     "media_type": "image/png"
                 }
             }
-            for image in images if image.strip()
+            for data in map(self.clean_base64, images) if data
         ]
 
 
@@ -1,11 +1,15 @@
 import logging
-from typing import Any, Dict, List, Tuple
-from langchain_core.messages import HumanMessage, BaseMessage, SystemMessage, AIMessage
+import orjson
+from typing import Any, ClassVar, Dict, List, Optional, Tuple
+from langchain_core.messages import HumanMessage, BaseMessage, AIMessage, AIMessageChunk
 from llm_wrappers.base_custom_model_llm import BaseCustomModelLLM  
 from llm_wrappers.config import GEMINI_API_BASE_URL
 
 logger = logging.getLogger(__name__)
 
+# Finish reasons of a normally completed candidate; anything else (SAFETY, RECITATION, ...) means it was cut off
+_NORMAL_FINISH_REASONS = (None, "STOP", "MAX_TOKENS", "FINISH_REASON_UNSPECIFIED")
+
 class GeminiModel(BaseCustomModelLLM):
     """
     Wrapper for Gemini API using Enterprise LangChain-compatible interface.
@@ -13,6 +17,8 @@ class GeminiModel(BaseCustomModelLLM):
     """
 
     api_base_url : str = GEMINI_API_BASE_URL
+    latency_max_output_tokens: int = 256 # Output cap applied when latency_optimized is set
+    supports_batch_api: ClassVar[bool] = True
 
     def _get_headers(self) -> Dict[str, str]:
         """Provides the common headers for the API request."""
@@ -24,8 +30,8 @@ class GeminiModel(BaseCustomModelLLM):
         
     def _build_request(self, messages: List[BaseMessage], **kwargs) -> Tuple[str, dict]:
         url = self.api_base_url + self.model_name + ":generateContent"
-        gemini_contents = self._process_messages(messages)
-        return url, {
+        system_prompts, gemini_contents = self._process_messages(messages)
+        payload = {
             "contents": gemini_contents,
             "model": self.model_name,
             "safety_settings": [
@@ -39,30 +45,75 @@ class GeminiModel(BaseCustomModelLLM):
                 "topP": 0.95,
                 "topK": 40
             }
-    }
+        }
+        if self.latency_optimized:
+            # Gemini has no priority tier; a tight output cap bounds generation time instead
+            payload["generation_config"]["maxOutputTokens"] = self.latency_max_output_tokens
+        if system_prompts:
+            # A dedicated system instruction keeps the shared prefix identical for implicit caching
+            payload["system_instruction"] = {"parts": [{"text": prompt} for prompt in system_prompts]}
+        return url, payload
     
-    def _process_messages(self, messages: List[BaseMessage]) -> List[Dict[str, Any]]:
-        messages = self.get_messages(messages)
-        gemini_contents = []
-        system_prompt = None
-
-        for message in messages:
-            if isinstance(message, HumanMessage):
-                gemini_contents.append(self._process_human_message(message, system_prompt))
-                system_prompt = None  
-            elif isinstance(message, SystemMessage):
-                system_prompt = message.content.strip() if message.content else ""
-            elif isinstance(message, AIMessage):
-                gemini_contents.append({
-                    "role": "assistant",
-                    "parts": [{"text": message.content.strip()}]
-                })
+    def _build_stream_request(self, messages: List[BaseMessage], **kwargs) -> Optional[Tuple[str, dict]]:
+        # Each SSE event is a partial GenerateContentResponse, parsed by _parse_stream_event
+        url, payload = self._build_request(messages, **kwargs)
+        return url.replace(":generateContent", ":streamGenerateContent?alt=sse"), payload
+
+    def _build_batch_request(self, message_lists: List[List[BaseMessage]]) -> Tuple[str, dict]:
+        """batchGenerateContent with inlined requests, each tagged with its index."""
+        requests = []
+        for index, messages in enumerate(message_lists):
+            _, request = self._build_request(messages)
+            request.pop("model", None)
+            requests.append({"request": request, "metadata": {"key": str(index)}})
+        url = self.api_base_url + self.model_name + ":batchGenerateContent"
+        return url, {
+            "batch": {
+                "display_name": f"{self.model_name}-batch",
+                "input_config": {"requests": {"requests": requests}}
+            }
+        }
+
+    async def _poll_batch(self, job: dict, count: int) -> Optional[List[Optional[str]]]:
+        # Operation names ("batches/...") are relative to the API version root, not /models/
+        base_url = self.api_base_url.rsplit("models/", 1)[0]
+        status = await self.async_client.get(base_url + job["name"], headers=self._get_headers())
+        status.raise_for_status()
+        operation = orjson.loads(status.content)
+        if not operation.get("done"):
+            return None
+        if "error" in operation:
+            raise RuntimeError(f"Gemini batch job failed: {operation['error']}")
+
+        texts: List[Optional[str]] = [None] * count
+        inlined = operation.get("response", {}).get("inlinedResponses", {}).get("inlinedResponses", [])
+        for position, entry in enumerate(inlined):
+            index = int(entry.get("metadata", {}).get("key", position))
+            if "response" in entry:
+                try:
+                    texts[index] = self._parse_response(entry["response"])
+                except ValueError as e:
+                    # Left as None so the chain retries this entry on its own
+                    logger.warning(f"Batch request {index} returned no content: {e}")
             else:
-                logger.warning(f"Unsupported message type: {type(message)}")
+                logger.warning(f"Batch request {index} did not succeed: {entry.get('error')}")
+        return texts
+
+    def _process_messages(self, messages: List[BaseMessage]) -> Tuple[List[str], List[Dict[str, Any]]]:
+        """Returns (system prompts, contents); the system prompts go in system_instruction."""
+        return self._dispatch_messages(messages)
 
-        return gemini_contents
+    def _handle_human(self, message: HumanMessage, system_prompts: List[str], gemini_contents: List[Dict[str, Any]]) -> None:
+        gemini_contents.append(self._process_human_message(message))
 
-    def _process_human_message(self, message: HumanMessage, system_prompt: str = "") -> Dict[str, Any]:
+    def _handle_ai(self, message: AIMessage, system_prompts: List[str], gemini_contents: List[Dict[str, Any]]) -> None:
+        # Gemini only accepts the "user" and "model" roles in contents
+        gemini_contents.append({
+            "role": "model",
+            "parts": [{"text": message.content.strip()}]
+        })
+
+    def _process_human_message(self, message: HumanMessage) -> Dict[str, Any]:
         parts = []
 
         # Handle images if provided
@@ -71,8 +122,7 @@ class GeminiModel(BaseCustomModelLLM):
 
         # Handle message content
         if message.content:
-            full_text = f"{system_prompt.strip()}\n{message.content.strip()}" if system_prompt else message.content
-            parts.append({"text": full_text})
+            parts.append({"text": message.content.strip()})
 
         return {
             "role": "user",
@@ -97,23 +147,73 @@ class GeminiModel(BaseCustomModelLLM):
         return processed
 
     def _parse_response(self, response_json: Dict[str, Any]) -> str:
-        parts = []
+        text = self._extract_text(response_json)
+        if text is None:
+            raise self._no_content_error(response_json)
+        return text
 
-        for candidate_response in response_json.get("candidates", []):
-            if isinstance(candidate_response, dict) and "content" in candidate_response:
-                content = candidate_response["content"]
-                if isinstance(content, dict) and "parts" in content:
-                    for part in content.get("parts", []):
-                        if isinstance(part, dict) and "text" in part:
-                            text = part["text"]
-                            parts.append(text)
-                        else:
-                            logger.warning(f"Unexpected part structure in parts list: {part}")
-                else:
-                    logger.warning(f"Missing or invalid 'parts' in content: {content}")
-            else:
-                logger.warning(f"Missing or invalid 'content' in candidate_response: {candidate_response}")
+    def _parse_stream_event(self, event: Dict[str, Any]) -> Optional[AIMessageChunk]:
+        """Events without parts are normal mid-stream (usage, finish); only blocked ones raise."""
+        text = self._extract_text(event)
+        if text is None:
+            if self._is_blocked(event):
+                raise self._no_content_error(event)
+            return None
+        return AIMessageChunk(content=text) if text else None
+
+    def _extract_text(self, response_json: Dict[str, Any]) -> Optional[str]:
+        """Joined text of every candidate's parts, or None when no candidate carries a parts list."""
+        candidates = response_json.get("candidates")
+        if not isinstance(candidates, list):
+            candidates = []
+        if logger.isEnabledFor(logging.DEBUG):
+            self._log_unexpected_candidates(candidates)
+        texts = []
+        found_parts = False
+        for candidate in candidates:
+            content = candidate.get("content") if isinstance(candidate, dict) else None
+            parts = content.get("parts") if isinstance(content, dict) else None
+            if not isinstance(parts, list):
+                continue
+            found_parts = True
+            texts.extend(part["text"] for part in parts if isinstance(part, dict) and "text" in part)
+        return "\n".join(texts) if found_parts else None
+
+    @staticmethod
+    def _is_blocked(response_json: Dict[str, Any]) -> bool:
+        if (response_json.get("promptFeedback") or {}).get("blockReason"):
+            return True
+        candidates = response_json.get("candidates")
+        return isinstance(candidates, list) and any(
+            isinstance(candidate, dict) and candidate.get("finishReason") not in _NORMAL_FINISH_REASONS
+            for candidate in candidates
+        )
+
+    @staticmethod
+    def _no_content_error(response_json: Dict[str, Any]) -> ValueError:
+        """Error for a response with no content parts, e.g. one blocked by the safety filters."""
+        candidates = response_json.get("candidates")
+        finish_reasons = [
+            candidate.get("finishReason") for candidate in candidates if isinstance(candidate, dict)
+        ] if isinstance(candidates, list) else []
+        return ValueError(
+            f"Gemini response has no content parts (finishReason={finish_reasons or None}, "
+            f"promptFeedback={response_json.get('promptFeedback')})."
+        )
 
-        return "\n".join(parts)
+    @staticmethod
+    def _log_unexpected_candidates(candidates: List[Any]) -> None:
+        """Debug-only report of candidate structures that _parse_response skips."""
+        for candidate_response in candidates:
+            if not isinstance(candidate_response, dict) or "content" not in candidate_response:
+                logger.debug(f"Missing or invalid 'content' in candidate_response: {candidate_response}")
+                continue
+            content = candidate_response["content"]
+            if not isinstance(content, dict) or not isinstance(content.get("parts"), list):
+                logger.debug(f"Missing or invalid 'parts' in content: {content}")
+                continue
+            for part in content["parts"]:
+                if not isinstance(part, dict) or "text" not in part:
+                    logger.debug(f"Unexpected part structure in parts list: {part}")
 
  
@@ -1,6 +1,10 @@
 import logging
-from typing import Any, Dict, List, Tuple
-from langchain_core.messages import HumanMessage, BaseMessage, SystemMessage, AIMessage
+import orjson
+from typing import Any, ClassVar, Dict, List, Optional, Sequence, Tuple, Union
+from langchain_core.language_models import LanguageModelInput
+from langchain_core.messages import HumanMessage, BaseMessage, SystemMessage, AIMessage, AIMessageChunk, ToolMessage
+from langchain_core.runnables import Runnable
+from langchain_core.utils.function_calling import convert_to_openai_tool
 from llm_wrappers.base_custom_model_llm import BaseCustomModelLLM
 
 logger = logging.getLogger(__name__)
@@ -14,7 +18,13 @@ class OpenAIChatModel(BaseCustomModelLLM):
     """
 
     api_base_url: str = OPENAI_API_BASE_URL
+    max_tokens: Optional[int] = None # Output cap per call; a max_tokens call kwarg overrides it
     # e.g., "gpt-5" / "gpt-4.1" / "gpt-4o" etc. Set via model_name in your base class.
+    _stream_text_prefix: ClassVar[Optional[str]] = "choices.item.message.content"
+    _message_handlers: ClassVar[Dict[type, str]] = {
+        **BaseCustomModelLLM._message_handlers,
+        ToolMessage: "_handle_tool",
+    }
 
     def _get_headers(self) -> Dict[str, str]:
         return {
@@ -36,60 +46,122 @@ class OpenAIChatModel(BaseCustomModelLLM):
             # tune as you like; keep defaults close to your Gemini config
             "temperature": kwargs.get("temperature", 0.2),
             "top_p": kwargs.get("top_p", 0.95),
-            # you can add tools/function-calling here if needed
         }
+        max_tokens = kwargs.get("max_tokens", self.max_tokens)
+        if max_tokens:
+            payload["max_tokens"] = max_tokens
+        if kwargs.get("stop"):
+            payload["stop"] = kwargs["stop"]
+        if self.latency_optimized:
+            payload["service_tier"] = "priority"
+        if kwargs.get("tools"):
+            payload["tools"] = kwargs["tools"]
+            # let the model request several tools in one turn; the agent runs them concurrently
+            payload["parallel_tool_calls"] = kwargs.get("parallel_tool_calls", True)
+            if kwargs.get("tool_choice"):
+                payload["tool_choice"] = kwargs["tool_choice"]
         return url, payload
 
+    def _build_stream_request(self, messages: List[BaseMessage], **kwargs) -> Optional[Tuple[str, dict]]:
+        url, payload = self._build_request(messages, **kwargs)
+        payload["stream"] = True
+        return url, payload
+
+    def _parse_stream_event(self, event: Dict[str, Any]) -> Optional[AIMessageChunk]:
+        """Chat Completions chunk: text deltas and partial tool calls, merged by LangChain via their index."""
+        choices = event.get("choices")
+        if not choices:
+            return None
+        delta = choices[0].get("delta") or {}
+        tool_call_chunks = [
+            {
+                "name": (tool_call.get("function") or {}).get("name"),
+                "args": (tool_call.get("function") or {}).get("arguments"),
+                "id": tool_call.get("id"),
+                "index": tool_call.get("index"),
+            }
+            for tool_call in delta.get("tool_calls") or ()
+        ]
+        content = delta.get("content") or ""
+        if not content and not tool_call_chunks:
+            return None
+        return AIMessageChunk(content=content, tool_call_chunks=tool_call_chunks)
+
+    def bind_tools(
+        self,
+        tools: Sequence[Any],
+        *,
+        tool_choice: Optional[Union[str, Dict[str, Any]]] = None,
+        parallel_tool_calls: bool = True,
+        **kwargs: Any,
+    ) -> Runnable[LanguageModelInput, BaseMessage]:
+        """Binds tools in OpenAI function-calling format; used by create_tool_calling_agent."""
+        formatted_tools = [convert_to_openai_tool(t) for t in tools]
+        if tool_choice:
+            kwargs["tool_choice"] = tool_choice
+        return self.bind(tools=formatted_tools, parallel_tool_calls=parallel_tool_calls, **kwargs)
+
     def _process_messages(self, messages: List[BaseMessage]) -> List[Dict[str, Any]]:
         """
         Convert LangChain messages to OpenAI chat format, preserving roles.
         If HumanMessage has images (base64 pngs), add them as data URLs in the content array.
         """
-        msgs = self.get_messages(messages)
-        out: List[Dict[str, Any]] = []
-        pending_system: str | None = None
-
-        for m in msgs:
-            if isinstance(m, SystemMessage):
-                # stash the latest system prompt to prepend to next user message (like you did for Gemini)
-                pending_system = (m.content or "").strip()
-            elif isinstance(m, HumanMessage):
-                content_parts: List[Dict[str, Any]] = []
-
-                # include system text inline (keeps parity with your Gemini pattern)
-                text = m.content or ""
-                if pending_system:
-                    text = f"{pending_system}\n{text}" if text else pending_system
-                if text:
-                    content_parts.append({"type": "text", "text": text})
-
-                # images: expect base64 PNGs in additional_kwargs["images"]
-                if hasattr(m, "additional_kwargs") and "images" in m.additional_kwargs:
-                    for b64_png in m.additional_kwargs["images"]:
-                        try:
-                            data_url = f"data:image/png;base64,{self.clean_base64(b64_png)}"
-                            content_parts.append({
-                                "type": "image_url",
-                                "image_url": {"url": data_url}
-                            })
-                        except Exception as e:
-                            logger.error(f"Error processing image: {e}")
-
-                out.append({"role": "user", "content": content_parts})
-                pending_system = None
-
-            elif isinstance(m, AIMessage):
-                out.append({"role": "assistant", "content": m.content or ""})
-
-            else:
-                logger.warning(f"Unsupported message type: {type(m)}")
-
+        _, out = self._dispatch_messages(messages)
+        if self.system_blocks:
+            # static blocks lead every request so OpenAI's automatic prefix caching applies
+            out = [{"role": "system", "content": block} for block in self.system_blocks] + out
         return out
 
-    def _parse_response(self, response_json: Dict[str, Any]) -> str:
+    def _handle_system(self, m: SystemMessage, system_prompts: List[str], out: List[Dict[str, Any]]) -> None:
+        # a real system message keeps the prefix identical across requests, so OpenAI can cache it
+        if m.content:
+            out.append({"role": "system", "content": m.content.strip()})
+
+    def _handle_human(self, m: HumanMessage, system_prompts: List[str], out: List[Dict[str, Any]]) -> None:
+        content_parts: List[Dict[str, Any]] = []
+
+        if m.content:
+            content_parts.append({"type": "text", "text": m.content})
+
+        # images: expect base64 PNGs in additional_kwargs["images"]
+        if hasattr(m, "additional_kwargs") and "images" in m.additional_kwargs:
+            for b64_png in m.additional_kwargs["images"]:
+                try:
+                    data_url = f"data:image/png;base64,{self.clean_base64(b64_png)}"
+                    content_parts.append({
+                        "type": "image_url",
+                        "image_url": {"url": data_url}
+                    })
+                except Exception as e:
+                    logger.error(f"Error processing image: {e}")
+
+        out.append({"role": "user", "content": content_parts})
+
+    def _handle_ai(self, m: AIMessage, system_prompts: List[str], out: List[Dict[str, Any]]) -> None:
+        if m.tool_calls:
+            # replay the tool calls so the following tool messages can refer to them by id
+            out.append({
+                "role": "assistant",
+                "content": m.content or None,
+                "tool_calls": [
+                    {
+                        "id": tool_call["id"],
+                        "type": "function",
+                        "function": {"name": tool_call["name"], "arguments": orjson.dumps(tool_call["args"]).decode()}
+                    }
+                    for tool_call in m.tool_calls
+                ]
+            })
+        else:
+            out.append({"role": "assistant", "content": m.content or ""})
+
+    def _handle_tool(self, m: ToolMessage, system_prompts: List[str], out: List[Dict[str, Any]]) -> None:
+        out.append({"role": "tool", "tool_call_id": m.tool_call_id, "content": str(m.content)})
+
+    def _parse_response(self, response_json: Dict[str, Any]) -> Union[str, AIMessage]:
         """
-        Pull plain text back from Chat Completions.
-        If you plan to support tool calls, extend this to handle choices[].message.tool_calls.
+        Pull plain text back from Chat Completions, or an AIMessage carrying
+        choices[].message.tool_calls when the model asked for tools.
         """
         choices = response_json.get("choices", [])
         if not choices:
@@ -98,6 +170,18 @@ class OpenAIChatModel(BaseCustomModelLLM):
 
         # take the first choice's text content
         msg = choices[0].get("message", {})
+        if msg.get("tool_calls"):
+            return AIMessage(
+                content=msg.get("content") or "",
+                tool_calls=[
+                    {
+                        "id": tool_call["id"],
+                        "name": tool_call["function"]["name"],
+                        "args": orjson.loads(tool_call["function"]["arguments"] or "{}"),
+                    }
+                    for tool_call in msg["tool_calls"]
+                ]
+            )
         content = msg.get("content", "")
         if isinstance(content, list):
             # content could be parts; join text parts
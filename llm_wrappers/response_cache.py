@@ -0,0 +1,60 @@
+import hashlib
+import threading
+from collections import OrderedDict
+from typing import Any, List, Optional
+
+import orjson
+import logging
+
+logger = logging.getLogger(__name__)
+
+class ResponseCache:
+    """
+    In-process LRU cache of exact LLM responses.
+
+    Keys are a blake2b digest of the model name, the messages and the call options, so a
+    repeated prompt (re-running a script, a retried test) returns without a network call.
+    Calls with a temperature above `max_temperature` are not cached, since their output is
+    meant to vary. A lock keeps the cache safe for the thread-pool callers.
+    """
+
+    def __init__(self, maxsize: int = 1024, max_temperature: float = 0.2):
+        self.maxsize = maxsize
+        self.max_temperature = max_temperature
+        self._entries: "OrderedDict[bytes, Any]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def make_key(self, model_name: str, messages: List[Any], options: dict) -> Optional[bytes]:
+        """Returns the cache key, or None when the call should not be cached."""
+        temperature = options.get("temperature")
+        if temperature is not None and temperature > self.max_temperature:
+            return None
+        digest = hashlib.blake2b(digest_size=16)
+        digest.update(model_name.encode())
+        for message in messages:
+            digest.update(orjson.dumps(
+                [message.type, message.content, message.additional_kwargs],
+                default=str
+            ))
+        digest.update(orjson.dumps(options, default=str, option=orjson.OPT_SORT_KEYS))
+        return digest.digest()
+
+    def get(self, key: bytes) -> Any:
+        with self._lock:
+            value = self._entries.get(key)
+            if value is not None:
+                self._entries.move_to_end(key)
+        if value is not None:
+            logger.debug("Response cache hit.")
+        return value
+
+    def put(self, key: bytes, value: Any) -> None:
+        with self._lock:
+            self._entries[key] = value
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    def clear_cache(self) -> None:
+        with self._lock:
+            self._entries.clear()
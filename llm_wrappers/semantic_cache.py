@@ -0,0 +1,104 @@
+import threading
+from typing import Dict, List, Optional
+
+import logging
+
+logger = logging.getLogger(__name__)
+
+class SemanticCache:
+    """
+    In-process response cache matched on prompt embedding similarity.
+
+    Near-identical prompts (the same stack trace with a different timestamp, a reworded
+    question) return the stored response instead of a new LLM call. Embeddings come from a
+    sentence-transformers model loaded on first use; lookups use a faiss HNSW index when
+    faiss is installed and a normalized numpy matrix otherwise. Entries are partitioned by
+    namespace (the model name) so responses never leak between models.
+    """
+
+    def __init__(
+        self,
+        model_name: str = "sentence-transformers/all-MiniLM-L6-v2",
+        threshold: float = 0.95,
+        max_entries: int = 10000,
+    ):
+        self.model_name = model_name
+        self.threshold = threshold
+        self.max_entries = max_entries
+        self._encoder = None
+        self._namespaces: Dict[str, "_Partition"] = {}
+        self._lock = threading.Lock()
+        self._encoder_lock = threading.Lock()
+
+    def embed(self, text: str):
+        if self._encoder is None:
+            # Concurrent first calls (e.g. from asyncio.to_thread) load the model only once
+            with self._encoder_lock:
+                if self._encoder is None:
+                    try:
+                        from sentence_transformers import SentenceTransformer
+                    except ImportError as e:
+                        raise ImportError("SemanticCache requires `pip install sentence-transformers`.") from e
+                    self._encoder = SentenceTransformer(self.model_name)
+        return self._encoder.encode([text], normalize_embeddings=True)[0].astype("float32")
+
+    def lookup(self, embedding, namespace: str = "", threshold: Optional[float] = None) -> Optional[str]:
+        with self._lock:
+            partition = self._namespaces.get(namespace)
+            if partition is None:
+                return None
+            response = partition.search(embedding, self.threshold if threshold is None else threshold)
+        if response is not None:
+            logger.debug(f"Semantic cache hit in namespace '{namespace}'.")
+        return response
+
+    def put(self, embedding, response: str, namespace: str = "") -> None:
+        with self._lock:
+            partition = self._namespaces.get(namespace)
+            if partition is None:
+                partition = self._namespaces[namespace] = _Partition(len(embedding))
+            if len(partition.responses) < self.max_entries:
+                partition.add(embedding, response)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._namespaces.clear()
+
+
+class _Partition:
+    """Vectors and responses for one namespace; similarity is the inner product of unit vectors."""
+
+    def __init__(self, dim: int):
+        import numpy as np
+
+        self._np = np
+        self.responses: List[str] = []
+        try:
+            import faiss
+
+            self._index = faiss.IndexHNSWFlat(dim, 32, faiss.METRIC_INNER_PRODUCT)
+            self._vectors = None
+        except ImportError:
+            self._index = None
+            self._vectors = np.empty((0, dim), dtype="float32")
+
+    def add(self, embedding, response: str) -> None:
+        vector = self._np.asarray(embedding, dtype="float32").reshape(1, -1)
+        if self._index is not None:
+            self._index.add(vector)
+        else:
+            self._vectors = self._np.vstack([self._vectors, vector])
+        self.responses.append(response)
+
+    def search(self, embedding, threshold: float) -> Optional[str]:
+        if not self.responses:
+            return None
+        vector = self._np.asarray(embedding, dtype="float32").reshape(1, -1)
+        if self._index is not None:
+            scores, ids = self._index.search(vector, 1)
+            score, idx = float(scores[0][0]), int(ids[0][0])
+        else:
+            similarities = self._vectors @ vector[0]
+            idx = int(similarities.argmax())
+            score = float(similarities[idx])
+        return self.responses[idx] if idx >= 0 and score >= threshold else None
@@ -1,5 +1,6 @@
 from regressionanalyser.analyzer.base_analyzer import BaseFailureAnalyzer
-from regressionanalyser.prompts.api_failure_prompt import analyse_regression_failures_prompt as api_failure
+from typing import Optional
+from regressionanalyser.prompts.api_failure_prompt import api_failure_prompt
 from regressionanalyser.analyzer.failure_chain import FailureChain
 from langchain_core.prompts import PromptTemplate
 
@@ -9,7 +10,7 @@ class APIFailureAnalyzer(BaseFailureAnalyzer):
     the batching and parallel processing of failures.
     """
 
-    prompt_template:PromptTemplate = api_failure
+    prompt_template:Optional[PromptTemplate] = None  # defaults to the API failure prompt, built on first use
     max_failures_per_request :int= 5
     
     def _get_failure_chain(self):
@@ -17,8 +18,12 @@ class APIFailureAnalyzer(BaseFailureAnalyzer):
         return FailureChain(
             llm=self.llm,
             output_parser=self.output_parser,
-            prompt_template=self.prompt_template,
+            prompt_template=self.prompt_template or api_failure_prompt(),
             batch_size=self.batch_size,
             max_items_per_request= self.max_failures_per_request,
+            rpm=self.rpm,
+            tpm=self.tpm,
+            cache=self.cache,
+            use_batch_api=self.use_batch_api,
             mode="api"
         )
\ No newline at end of file
@@ -1,14 +1,14 @@
 from abc import ABC, abstractmethod
-from typing import Any, Dict, List
+from typing import Any, Dict, List, Optional
 
 from pydantic import BaseModel
 from langchain_core.language_models.chat_models import BaseChatModel
+from regressionanalyser.analyzer.cache import AnalysisCache
 from regressionanalyser.analyzer.failure_chain import FailureChain
 from regressionanalyser.parser.base_parser import BaseParser
 from regressionanalyser.parser.cucumber_parser import CucumberParser
 from regressionanalyser.parser.output_parser import CustomOutputParser, FailureAnalysisResult
 from regressionanalyser.utils.report_ingestor import download_report_from_s3
-from langchain.output_parsers import PydanticOutputParser
 
 class BaseFailureAnalyzer(ABC, BaseModel):
 
@@ -17,6 +17,10 @@ class BaseFailureAnalyzer(ABC, BaseModel):
     output_parser:CustomOutputParser = CustomOutputParser(pydantic_object=FailureAnalysisResult)
     batch_size :int= 25
     max_failures_per_request :int= 1
+    rpm :Optional[int]= None
+    tpm :Optional[int]= None
+    use_batch_api :bool= False
+    cache :Optional[AnalysisCache]= None
 
     model_config = {
         "arbitrary_types_allowed": True
@@ -38,6 +42,14 @@ class BaseFailureAnalyzer(ABC, BaseModel):
         
         failure_chain = self._get_failure_chain()
         return failure_chain.run(structured_failures)
+
+    async def aanalyzeReport(self, report_data: List[Dict[str, Any]]) -> List[Any]:
+        """Same as analyzeReport, but the LLM calls run on the event loop without blocking it."""
+        failures = self.input_parser.extract_failures(report_data)
+        structured_failures = [self.input_parser.structure_failure(f) for f in failures]
+
+        failure_chain = self._get_failure_chain()
+        return await failure_chain.arun(structured_failures)
     
     def analyzeS3Report(self, report_path:str, app_code:str) -> List[Any]:
         report_data = self.load_report(report_path,app_code)
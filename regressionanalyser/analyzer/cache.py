@@ -0,0 +1,51 @@
+import hashlib
+from typing import Any, Iterable, Optional
+
+import logging
+
+logger = logging.getLogger(__name__)
+
+_MISS = object()
+
+class AnalysisCache:
+    """
+    Cache of parsed failure analyses, shared across regression runs.
+
+    Entries are keyed on SHA-256(model name, prompt text, screenshots) and persisted on
+    disk with diskcache. Matching is exact only: an analysis carries the feature name,
+    file path and line number of the failures it was made for, so a merely similar
+    prompt must never reuse it.
+    """
+
+    def __init__(self, directory: str = ".analysis_cache", expire: Optional[float] = None):
+        try:
+            import diskcache
+        except ImportError as e:
+            raise ImportError("AnalysisCache requires `pip install diskcache`.") from e
+        self._store = diskcache.Cache(directory)
+        self.expire = expire
+
+    @staticmethod
+    def make_key(model_name: str, prompt_text: str, images: Iterable[str] = ()) -> str:
+        digest = hashlib.sha256()
+        digest.update(model_name.encode())
+        digest.update(b"\0")
+        digest.update(prompt_text.encode())
+        for image in images:
+            digest.update(b"\0")
+            digest.update(image.encode())
+        return digest.hexdigest()
+
+    def get(self, key: str) -> Any:
+        """Returns the cached analysis or None."""
+        value = self._store.get(key, default=_MISS)
+        if value is _MISS:
+            return None
+        logger.debug("Analysis cache hit.")
+        return value
+
+    def set(self, key: str, value: Any) -> None:
+        self._store.set(key, value, expire=self.expire)
+
+    def clear(self) -> None:
+        self._store.clear()
@@ -1,39 +1,193 @@
+import asyncio
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from llm_chains.base_chain import BaseChain
-from langchain_core.messages import HumanMessage
-from typing import List, Dict, Any
+from langchain_core.messages import BaseMessage, HumanMessage
+from langchain_core.runnables import RunnableLambda
+from typing import List, Dict, Any, Optional, Tuple
+from regressionanalyser.analyzer.cache import AnalysisCache
 import logging
 
 logger = logging.getLogger(__name__)
 
 class FailureChain(BaseChain):
     mode: str = "api"  # or "ui"
+    items_variable: str = "failure_details"
+    cache: Optional[AnalysisCache] = None
+    max_images_per_request: int = 8  # ui mode: well below every provider's per-request image limit
+    max_image_chars_per_request: int = 15_000_000  # ui mode: base64 budget for the screenshots of one request
 
-    def _prepare_llm_input(self, failures: List[Dict[str, Any]]) -> List[HumanMessage]:
+    model_config = {
+        "arbitrary_types_allowed": True
+    }
+
+    def model_post_init(self, __context: Any) -> None:
+        super().model_post_init(__context)
+        if self.cache is not None:
+            # Every per-request path (ui, api, sync, async) funnels through the cached invoke;
+            # provider batch jobs check and fill the cache in _abatch_job_results
+            self._chain = RunnableLambda(self._invoke_cached, afunc=self._ainvoke_cached)
+
+    def _cache_lookup(self, messages: List[BaseMessage]) -> Tuple[str, Any]:
+        """Returns (key, cached value or None)."""
+        model_name = getattr(self.llm, "model_name", type(self.llm).__name__)
+        prompt_text = "\n".join(str(m.content) for m in messages)
+        images = [image for m in messages for image in m.additional_kwargs.get("images", [])]
+        key = AnalysisCache.make_key(model_name, prompt_text, images)
+        return key, self.cache.get(key)
+
+    def _invoke_cached(self, failures: List[Any]) -> Any:
+        messages = self._prepare_llm_input(failures)
+        key, cached = self._cache_lookup(messages)
+        if cached is not None:
+            return cached
+        result = self._llm_chain.invoke(messages)
+        self.cache.set(key, result)
+        return result
+
+    async def _ainvoke_cached(self, failures: List[Any]) -> Any:
+        messages = self._prepare_llm_input(failures)
+        key, cached = self._cache_lookup(messages)
+        if cached is not None:
+            return cached
+        result = await self._llm_chain.ainvoke(messages)
+        self.cache.set(key, result)
+        return result
+
+    async def _abatch_job_results(self, batches: List[List[str]]) -> List[Any]:
+        """Serves cached sub-batches directly and submits only the rest to the batch job."""
+        if self.cache is None:
+            return await super()._abatch_job_results(batches)
+        batch_results: List[Any] = [None] * len(batches)
+        pending = []
+        for index, batch in enumerate(batches):
+            key, cached = self._cache_lookup(self._prepare_llm_input(batch))
+            if cached is not None:
+                batch_results[index] = cached
+            else:
+                pending.append((index, key))
+        if pending:
+            fresh_results = await super()._abatch_job_results([batches[index] for index, _ in pending])
+            for (index, key), result in zip(pending, fresh_results):
+                batch_results[index] = result
+                if result is not None:
+                    self.cache.set(key, result)
+        return batch_results
+
+    def _prepare_llm_input(self, failures: List[Any]) -> List[HumanMessage]:
+        # Format instructions are bound into self._prompt once per chain (see BaseChain.model_post_init)
         if self.mode == "ui":
-            failure = failures[0]
-            # Remove screenshot from prompt input
-            failure_for_prompt = {k: v for k, v in failure.items() if k != "screenshot"}
-            prompt_text = self.prompt_template.format(failure_details=failure_for_prompt, format_instructions=self.output_parser.get_format_instructions())
-            screenshot = failure.get("screenshot")
-            if screenshot:
-                return [HumanMessage(content=prompt_text, additional_kwargs={"images": [screenshot]})]
+            # Failures go in as one JSON array; screenshots are attached in the same order and
+            # each failure points at its own through screenshot_index (null when it has none).
+            failure_details = []
+            screenshots = []
+            for failure in failures:
+                details = failure.copy()
+                screenshot = details.pop("screenshot", None)
+                if screenshot:
+                    screenshots.append(screenshot)
+                details["screenshot_index"] = len(screenshots) if screenshot else None
+                failure_details.append(details)
+            prompt_text = self._prompt.format(failure_details=self._render_items(failure_details))
+            if screenshots:
+                return [HumanMessage(content=prompt_text, additional_kwargs={"images": screenshots})]
             return [HumanMessage(content=prompt_text)]
         else:
-            # API mode: batch failures, no screenshots
-            failures_for_prompt = [{k: v for k, v in f.items() if k != "screenshot"} for f in failures]
-            prompt_text = self.prompt_func(failures_for_prompt, self.output_parser.get_format_instructions())
-            return [HumanMessage(content=prompt_text)]
+            # API mode: failures arrive without screenshots, already rendered to JSON by _create_batched_items
+            return super()._prepare_llm_input(failures)
+
+    @staticmethod
+    def _strip_screenshot(failure: Dict[str, Any]) -> Dict[str, Any]:
+        """Returns the failure without its screenshot; copies only when there is one to drop."""
+        if "screenshot" not in failure:
+            return failure
+        failure = failure.copy()
+        failure.pop("screenshot")
+        return failure
 
     def process_batched_items(self, items: List[Dict[str, Any]], max_chars: int = 200000) -> List[Any]:
         """
         Removes screenshots from each failure before batching and processing.
         """
-        items_no_screenshot = [{k: v for k, v in item.items() if k != "screenshot"} for item in items]
+        items_no_screenshot = [self._strip_screenshot(item) for item in items]
         return super().process_batched_items(items_no_screenshot, max_chars=max_chars)
 
+    async def aprocess_batched_items(self, items: List[Dict[str, Any]], max_chars: int = 200000) -> List[Any]:
+        items_no_screenshot = [self._strip_screenshot(item) for item in items]
+        return await super().aprocess_batched_items(items_no_screenshot, max_chars=max_chars)
+
+    def _group_ui_failures(self, failures: List[Dict[str, Any]]) -> List[List[Dict[str, Any]]]:
+        """
+        Groups UI failures into vision requests of at most max_items_per_request failures,
+        max_images_per_request screenshots and max_image_chars_per_request of base64.
+        """
+        groups = []
+        current_group = []
+        image_count = 0
+        image_chars = 0
+        for failure in failures:
+            screenshot_chars = len(failure.get("screenshot") or "")
+            has_image = 1 if screenshot_chars else 0
+            if current_group and (
+                len(current_group) >= self.max_items_per_request or
+                image_count + has_image > self.max_images_per_request or
+                image_chars + screenshot_chars > self.max_image_chars_per_request
+            ):
+                groups.append(current_group)
+                current_group = []
+                image_count = 0
+                image_chars = 0
+            current_group.append(failure)
+            image_count += has_image
+            image_chars += screenshot_chars
+        if current_group:
+            groups.append(current_group)
+        return groups
+
+    def _invoke_group(self, failures: List[Dict[str, Any]]) -> Any:
+        """Analyzes a group of UI failures in one request: prompt with screenshots -> llm -> output parser."""
+        return self._chain.invoke(failures)
+
+    async def _ainvoke_group(self, failures: List[Dict[str, Any]]) -> Any:
+        return await self._chain.ainvoke(failures)
+
+    def _run_parallel(self, failures: List[Dict[str, Any]]) -> List[Any]:
+        """
+        Each group of UI failures is an independent LLM request, so up to self.batch_size of them
+        run concurrently. Results keep the order of the input failures.
+        """
+        groups = self._group_ui_failures(failures)
+        group_results = [None] * len(groups)
+        if groups:
+            with ThreadPoolExecutor(max_workers=min(self.batch_size, len(groups))) as executor:
+                futures = {executor.submit(self._invoke_group, group): idx for idx, group in enumerate(groups)}
+                for future in as_completed(futures):
+                    group_results[futures[future]] = future.result()
+        results = []
+        self._collect_results(results, group_results)
+        return results
+
+    async def _arun_parallel(self, failures: List[Dict[str, Any]]) -> List[Any]:
+        semaphore = asyncio.Semaphore(self.batch_size)
+
+        async def run(group: List[Dict[str, Any]]) -> Any:
+            async with semaphore:
+                return await self._ainvoke_group(group)
+
+        group_results = await asyncio.gather(*(run(group) for group in self._group_ui_failures(failures)))
+        results = []
+        self._collect_results(results, group_results)
+        return results
+
     def run(self, failures: List[Dict[str, Any]]) -> List[Any]:
         logger.info(f"{self.mode} analyzer processing {len(failures)} failures.")
         if self.mode == "ui":
-            return self.process_batch(failures)
+            return self._run_parallel(failures)
+        else:
+            return self.process_batched_items(failures)
+
+    async def arun(self, failures: List[Dict[str, Any]]) -> List[Any]:
+        logger.info(f"{self.mode} analyzer processing {len(failures)} failures asynchronously.")
+        if self.mode == "ui":
+            return await self._arun_parallel(failures)
         else:
-            return self.process_batched_items(failures)
\ No newline at end of file
+            return await self.aprocess_batched_items(failures)
\ No newline at end of file
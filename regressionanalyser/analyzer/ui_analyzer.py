@@ -1,23 +1,26 @@
-from typing import Any, Callable, Dict, List
-from concurrent.futures import ThreadPoolExecutor
-from langchain_core.messages import HumanMessage
+from typing import Optional
 from regressionanalyser.analyzer.base_analyzer import  BaseFailureAnalyzer
 from regressionanalyser.analyzer.failure_chain import FailureChain
 from langchain_core.prompts import PromptTemplate
-from regressionanalyser.prompts.ui_failure_prompt import analyse_regression_failures_prompt as ui_failure
+from regressionanalyser.prompts.ui_failure_prompt import ui_failure_prompt
 
 
 
 class UIFailureAnalyzer(BaseFailureAnalyzer):
     """Analyzer for UI failures with screenshots"""
 
-    prompt_template:PromptTemplate = ui_failure
+    prompt_template:Optional[PromptTemplate] = None  # defaults to the UI failure prompt, built on first use
+    max_failures_per_request :int= 4
 
     def _get_failure_chain(self):
         return FailureChain(
             llm=self.llm,
             output_parser=self.output_parser,
-            prompt_template=self.prompt_template,
+            prompt_template=self.prompt_template or ui_failure_prompt(),
             batch_size=self.batch_size,
+            max_items_per_request=self.max_failures_per_request,
+            rpm=self.rpm,
+            tpm=self.tpm,
+            cache=self.cache,
             mode='ui'
         )
\ No newline at end of file
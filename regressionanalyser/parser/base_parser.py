@@ -1,4 +1,4 @@
-from typing import List, Dict, Any
+from typing import Iterable, List, Dict, Any
 from abc import ABC, abstractmethod
 
 class BaseParser(ABC):
@@ -7,9 +7,9 @@ class BaseParser(ABC):
     """
 
     @abstractmethod
-    def extract_failures(self, report_data: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    def extract_failures(self, report_data: List[Dict[str, Any]]) -> Iterable[Dict[str, Any]]:
         """
-        Extracts raw failures from the report data.
+        Extracts raw failures from the report data. May be a generator.
         """
         pass
 
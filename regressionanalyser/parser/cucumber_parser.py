@@ -1,4 +1,4 @@
-from typing import Dict, List, Any
+from typing import Dict, Iterable, Iterator, List, Any
 import re
 import logging
 
@@ -6,26 +6,31 @@ from regressionanalyser.parser.base_parser import BaseParser
 
 logger = logging.getLogger("CucumberParser")
 
+_FILE_RE = re.compile(r'at (.+?):')
+_LINE_RE = re.compile(r':(\d+)')
+
 class CucumberParser(BaseParser):
-    def extract_failures(self, cucumber_data: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
-        failures = []
+    def extract_failures(self, cucumber_data: List[Dict[str, Any]]) -> Iterator[Dict[str, Any]]:
+        """Yields failures lazily so callers can structure each one as it is found."""
+        count = 0
         logger.info("Extracting failures from Cucumber report.")
 
         for feature in cucumber_data:
             for scenario in feature.get('elements', []):
-                for step in scenario.get('steps', []):
+                steps = scenario.get('steps', [])
+                for step in steps:
                     if step.get('result', {}).get('status') == "failed":
-                        after_step = scenario.get('steps', [])[-1]
+                        # Only the PNG of the last step is used, so the other embeddings are not carried along
                         failure = {
                             'feature': feature.get('name'),
                             'scenario': scenario.get('name'),
                             'step': step.get("name"),
                             'error_message': step.get('result', {}).get('error_message'),
-                            'embeddings': after_step.get('embeddings', [])
+                            'screenshot': self.extract_screenshot(steps[-1].get('embeddings', ()))
                         }
-                        failures.append(failure)
-        logger.info(f"Found {len(failures)} failed scenarios.")
-        return failures
+                        count += 1
+                        yield failure
+        logger.info(f"Found {count} failed scenarios.")
 
     def structure_failure(self, failure: Dict[str, Any]) -> Dict[str, Any]:
         structured_failure = {
@@ -35,20 +40,18 @@ class CucumberParser(BaseParser):
             'scenario_name': f"{failure['scenario']}",
             'file_path': self._extract_file_path(failure['error_message']),
             'line_number': self._extract_line_number(failure['error_message']),
-            'screenshot': self.extract_screenshot(failure.get('embeddings', []))
+            'screenshot': failure.get('screenshot', '')
         }
         return structured_failure
 
-    def extract_screenshot(self, embeddings: List[Dict[str, str]]) -> str:
-        for embedding in embeddings:
-            if embedding.get('mime_type') == 'image/png':
-                return embedding.get('data', '')
-        return ""
+    def extract_screenshot(self, embeddings: Iterable[Dict[str, str]]) -> str:
+        png_embedding = next((e for e in embeddings if e.get('mime_type') == 'image/png'), None)
+        return png_embedding.get('data', '') if png_embedding else ""
 
     def _extract_file_path(self, error_message: str) -> str:
-        match = re.search(r'at (.+?):', error_message)
+        match = _FILE_RE.search(error_message)
         return match.group(1) if match else ""
 
     def _extract_line_number(self, error_message: str) -> str:
-        match = re.search(r':(\d+)', error_message)
+        match = _LINE_RE.search(error_message)
         return match.group(1) if match else ""
\ No newline at end of file
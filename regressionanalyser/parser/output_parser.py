@@ -1,11 +1,17 @@
-from jsonschema import ValidationError
-from pydantic import BaseModel, Field
-from langchain.output_parsers import PydanticOutputParser
-from typing import List, Any
-import json
+from functools import lru_cache
+from pydantic import BaseModel, Field, TypeAdapter, ValidationError
+from langchain_core.output_parsers import PydanticOutputParser
+from typing import List, Any, Type, Union
 import re
 from langchain_core.outputs import Generation
 
+_FENCE_RE = re.compile(r"```json\s*|```\s*$", re.DOTALL)
+
+@lru_cache(maxsize=None)
+def _list_adapter(model: Type[BaseModel]) -> TypeAdapter:
+    """Built once per model; validates a JSON array straight from bytes in pydantic-core."""
+    return TypeAdapter(List[model])
+
 class FailureAnalysisResult(BaseModel):
     """
     Pydantic model representing a single analyzed test failure result.
@@ -22,6 +28,28 @@ class FailureAnalysisResult(BaseModel):
     file_path: str = Field(..., description="Path to the test file.")
     line_number: str = Field(..., description="Line number in the test file where the failure occurred.")
 
+try:
+    import msgspec
+except ImportError:
+    msgspec = None
+
+if msgspec is not None:
+    class _FailureAnalysisStruct(msgspec.Struct):
+        """Slotted mirror of FailureAnalysisResult for msgspec's single-pass JSON decode."""
+        detailed_reason: str
+        error_message: str
+        squad_name: str
+        possible_causes: List[str]
+        recommended_fixes: List[str]
+        feature_name: str
+        scenario_name: str
+        step_details: str
+        file_path: str
+        line_number: str
+
+    # One decoder for both shapes the LLM returns: an array of results or a single object
+    _FAILURE_DECODER = msgspec.json.Decoder(Union[List[_FailureAnalysisStruct], _FailureAnalysisStruct])
+
 class CustomOutputParser(PydanticOutputParser, BaseModel):
     def parse(self, text: str) -> FailureAnalysisResult:
         parsed_data = super().parse(text)
@@ -36,25 +64,48 @@ class CustomOutputParser(PydanticOutputParser, BaseModel):
         if not result or not isinstance(result, list):
             raise ValueError("Expected a list of Generation objects.")
 
-        llm_output_text = result[0].text
-        
-        # --- NEW CODE: Strip markdown fences ---
-        # The regex pattern will match and remove the '```json' and '```' fences.
-        llm_output_text = re.sub(r"```json\s*|```\s*$", "", llm_output_text, flags=re.DOTALL).strip()
-        # --- END OF NEW CODE ---
+        llm_output_text = self._strip_fences(result[0].text)
+
+        if msgspec is not None and self.pydantic_object is FailureAnalysisResult:
+            return self._decode_failures(llm_output_text)
         
         try:
-            parsed_data = json.loads(llm_output_text)
-            
-            if isinstance(parsed_data, list):
-                # If it's a list, validate each item.
-                return [[self.pydantic_object.model_validate(item)] for item in parsed_data]
+            # JSON parsing and validation run in a single pydantic-core pass; invalid JSON
+            # surfaces as a ValidationError as well.
+            if llm_output_text.startswith("["):
+                return _list_adapter(self.pydantic_object).validate_json(llm_output_text)
             else:
-                # If it's a single dict, validate and wrap in a list.
-                validated_item = self.pydantic_object.model_validate(parsed_data)
+                # If it's a single object, validate and wrap in a list.
+                validated_item = self.pydantic_object.model_validate_json(llm_output_text)
                 return [validated_item]
-        except (json.JSONDecodeError, ValidationError) as e:
+        except ValidationError as e:
             # Re-raising the error with the cleaned text for better debugging.
             raise ValueError(
                 f"Could not parse LLM output as JSON. Output was:\n{llm_output_text}\nError: {e}"
             ) from e
+
+    @staticmethod
+    def _strip_fences(text: str) -> str:
+        """Removes the '```json' and '```' markdown fences around the LLM output."""
+        text = text.strip()
+        if "```" not in text:
+            return text
+        # Common case: the whole response is a single fenced block
+        if text.startswith("```json") and text.endswith("```") and text.count("```") == 2:
+            return text.removeprefix("```json").removesuffix("```").strip()
+        return _FENCE_RE.sub("", text).strip()
+
+    @staticmethod
+    def _decode_failures(llm_output_text: str) -> List[FailureAnalysisResult]:
+        """
+        msgspec parses and type-checks the JSON in one C pass; the structs are then wrapped
+        with model_construct, which skips re-validating what msgspec already checked.
+        """
+        try:
+            decoded = _FAILURE_DECODER.decode(llm_output_text)
+        except msgspec.DecodeError as e:
+            raise ValueError(
+                f"Could not parse LLM output as JSON. Output was:\n{llm_output_text}\nError: {e}"
+            ) from e
+        structs = decoded if isinstance(decoded, list) else [decoded]
+        return [FailureAnalysisResult.model_construct(**msgspec.structs.asdict(item)) for item in structs]
@@ -1,3 +1,4 @@
+from functools import cache
 from langchain_core.prompts import PromptTemplate
 
 api_failure_template = """
@@ -26,4 +27,7 @@ Important Considerations:
 {format_instructions}
 """
 
-analyse_regression_failures_prompt = PromptTemplate.from_template(api_failure_template)
\ No newline at end of file
+@cache
+def api_failure_prompt() -> PromptTemplate:
+    """Parsed once on first use and shared by every analyzer."""
+    return PromptTemplate.from_template(api_failure_template)
@@ -1,11 +1,16 @@
+from functools import cache
 from langchain_core.prompts import PromptTemplate
 
 ui_failure_template = """
-Analyze the error message and screenshot (if provided) to determine the reason for the failure.
+Analyze each failure's error message and screenshot (if provided) to determine the reason for the failure.
 
 Error Details: {failure_details}
 
-Generate a JSON object representing the following information based on the error details and screenshot analysis.
+Error Details is a JSON array of failures. The screenshots are attached in the same order as the failures;
+a failure's "screenshot_index" is the 1-based position of its screenshot, or null if it has none.
+Only use a failure's own screenshot when analyzing it.
+
+Generate a JSON object for each failure representing the following information based on the error details and screenshot analysis.
 
 The output should be valid JSON and should not contain unnecessary escape characters.
 
@@ -20,9 +25,12 @@ Error Category Determination Logic:
 
 Important Considerations:
 * Provide detailed and actionable insights.
-* Return ONLY the JSON object, no extra text or information.
+* Return ONLY an array of the JSON objects, one per failure in the same order as Error Details, no extra text or information.
 
 {format_instructions}
 """
 
-analyse_regression_failures_prompt = PromptTemplate.from_template(ui_failure_template)
\ No newline at end of file
+@cache
+def ui_failure_prompt() -> PromptTemplate:
+    """Parsed once on first use and shared by every analyzer."""
+    return PromptTemplate.from_template(ui_failure_template)
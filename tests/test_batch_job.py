@@ -0,0 +1,54 @@
+import asyncio
+
+import orjson
+from langchain_core.prompts import PromptTemplate
+
+from llm_chains.base_chain import BaseChain
+from llm_wrappers.claude_llm_model import ClaudeModel
+from regressionanalyser.parser.output_parser import CustomOutputParser, FailureAnalysisResult
+
+
+def _result(name: str) -> dict:
+    return {
+        "detailed_reason": "reason",
+        "error_message": "error",
+        "squad_name": "squad",
+        "possible_causes": ["cause"],
+        "recommended_fixes": ["fix"],
+        "feature_name": name,
+        "scenario_name": "scenario",
+        "step_details": "step",
+        "file_path": "src/feature.feature",
+        "line_number": "1",
+    }
+
+
+def test_batch_job_retries_failed_and_unparseable_entries(monkeypatch):
+    async def fake_batch_job(self, message_lists):
+        # entry 0 succeeded, entry 1 failed in the job, entry 2 is not JSON
+        return [orjson.dumps([_result("first")]).decode(), None, "not json"]
+
+    retried = []
+
+    async def fake_single_batch(self, token_batch):
+        retried.append(token_batch)
+        return [FailureAnalysisResult(**_result(f"retry-{len(retried)}"))]
+
+    monkeypatch.setattr(ClaudeModel, "abatch_job", fake_batch_job)
+    monkeypatch.setattr(BaseChain, "_aprocess_single_token_batch", fake_single_batch)
+    chain = BaseChain(
+        llm=ClaudeModel(model_name="claude-test", api_key="test-key"),
+        output_parser=CustomOutputParser(pydantic_object=FailureAnalysisResult),
+        prompt_template=PromptTemplate.from_template("Analyze {items}"),
+        max_items_per_request=1,
+        use_batch_api=True,
+        batch_api_threshold=1,
+    )
+
+    items = [{"name": "a"}, {"name": "b"}, {"name": "c"}]
+    results = asyncio.run(chain.aprocess_batched_items(items))
+
+    # Only entries 1 and 2 go through the single-batch path; entry 0's parsed result is kept
+    assert sorted(orjson.loads(batch[0])["name"] for batch in retried) == ["b", "c"]
+    assert results[0].feature_name == "first"
+    assert sorted(result.feature_name for result in results[1:]) == ["retry-1", "retry-2"]
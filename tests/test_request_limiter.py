@@ -0,0 +1,53 @@
+import httpx
+import pytest
+import orjson
+from langchain_core.output_parsers import PydanticOutputParser
+from langchain_core.prompts import PromptTemplate
+from pydantic import BaseModel
+
+from llm_chains.base_chain import BaseChain
+from llm_wrappers.base_custom_model_llm import BaseCustomModelLLM
+from llm_wrappers.opeai_llm_model import OpenAIChatModel
+
+
+class Answer(BaseModel):
+    answer: str
+
+
+def test_invoke_with_rpm_throttles_through_request_limiter(monkeypatch):
+    requests = []
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        requests.append(request)
+        body = {"choices": [{"message": {"content": '{"answer": "ok"}'}}]}
+        return httpx.Response(200, content=orjson.dumps(body))
+
+    monkeypatch.setattr(BaseCustomModelLLM, "_client", httpx.Client(transport=httpx.MockTransport(handler)))
+    llm = OpenAIChatModel(model_name="gpt-4o", api_key="test-key")
+    chain = BaseChain(
+        llm=llm,
+        output_parser=PydanticOutputParser(pydantic_object=Answer),
+        prompt_template=PromptTemplate.from_template("Answer for {items}"),
+        rpm=60,
+    )
+
+    # The chain's budget goes on the wrapper's own limiter, not LangChain's rate_limiter
+    assert llm.request_limiter is not None
+    assert llm.rate_limiter is None
+
+    assert chain.process_single({"question": "ping"}) == Answer(answer="ok")
+    assert len(requests) == 1
+
+
+def test_chain_with_conflicting_budget_is_rejected():
+    llm = OpenAIChatModel(model_name="gpt-4o", api_key="test-key")
+    chain_args = dict(
+        llm=llm,
+        output_parser=PydanticOutputParser(pydantic_object=Answer),
+        prompt_template=PromptTemplate.from_template("Answer for {items}"),
+    )
+    BaseChain(**chain_args, rpm=60)
+    # The same budget is fine; a different one would silently not apply
+    BaseChain(**chain_args, rpm=60)
+    with pytest.raises(ValueError):
+        BaseChain(**chain_args, rpm=120)
@@ -1,32 +1,80 @@
+import asyncio
 import os
 from dotenv import load_dotenv, find_dotenv
 from llm_wrappers.gemini_llm_model import GeminiModel
-from langchain_core.prompts import PromptTemplate
+from llm_wrappers.response_cache import ResponseCache
+from langchain_core.prompts import ChatPromptTemplate, MessagesPlaceholder
 from langchain_core.output_parsers import StrOutputParser
 from langchain_core.runnables.history import RunnableWithMessageHistory
-from langchain_community.chat_message_histories import ChatMessageHistory
+from langchain_community.chat_message_histories import RedisChatMessageHistory
+from langchain_core.chat_history import BaseChatMessageHistory
+from langchain_core.messages import AIMessage, BaseMessage, HumanMessage, SystemMessage
+from typing import List, Sequence, Tuple
 
-# Load environment variables
-_ = load_dotenv(find_dotenv())
+# Load environment variables once per process tree; find_dotenv walks up the filesystem,
+# so child processes and re-imports that inherit _ENV_LOADED skip the search
+if not os.environ.get("_ENV_LOADED"):
+    load_dotenv(find_dotenv())
+    os.environ["_ENV_LOADED"] = "1"
 
 # Initialize LLM
 gemini_llm = GeminiModel(
     model_name="gemini-2.0-flash",
-    api_key=os.environ.get("GEMINI_API_KEY")
+    api_key=os.environ.get("GEMINI_API_KEY"),
+    # Exact repeats of a prompt skip the network; no semantic matching, since prompts that
+    # differ by one word ("Hyderabad" / "Telangana") must not share an answer
+    response_cache=ResponseCache()
 )
 
-# In-memory dict to store histories by session_id
+# With REDIS_URL set, histories live in Redis and survive restarts and are shared by every
+# worker; otherwise fall back to an in-memory dict keyed by session_id. The Redis backend is
+# optional and needs `pip install redis`, which requirements.txt does not include.
+REDIS_URL = os.environ.get("REDIS_URL")
 store = {}
 
-def get_session_history(session_id: str) -> ChatMessageHistory:
-    if session_id not in store:
-        store[session_id] = ChatMessageHistory()
-    return store[session_id]
 
-# Prompt
-prompt = PromptTemplate.from_template(
-    "You are a chef. Suggest a famous dish from {location}."
-)
+class CompactChatMessageHistory(BaseChatMessageHistory):
+    """
+    In-memory history kept as (type, content) tuples instead of message objects.
+    Message objects are only built when the prompt reads `messages`, so long-lived
+    sessions hold two strings per turn rather than a full pydantic model each.
+    """
+
+    _message_types = {"human": HumanMessage, "ai": AIMessage, "system": SystemMessage}
+
+    def __init__(self):
+        self._msgs: List[Tuple[str, str]] = []
+
+    @property
+    def messages(self) -> List[BaseMessage]:
+        return [self._message_types[role](content=content) for role, content in self._msgs]
+
+    def add_messages(self, messages: Sequence[BaseMessage]) -> None:
+        self._msgs.extend((m.type, m.content) for m in messages)
+
+    def clear(self) -> None:
+        self._msgs.clear()
+
+
+def get_session_history(session_id: str) -> BaseChatMessageHistory:
+    if REDIS_URL:
+        return RedisChatMessageHistory(session_id=session_id, url=REDIS_URL)
+    # One lookup on the common path; a history is only built for a new session
+    history = store.get(session_id)
+    if history is None:
+        history = store[session_id] = CompactChatMessageHistory()
+    return history
+
+# Prompt: static system prompt -> history -> latest user turn. Only the end changes between
+# turns, so the system prompt and earlier history form a byte-stable prefix the provider can
+# cache (the wrappers send the system prompt in the provider's dedicated system field).
+CHEF_SYSTEM_PROMPT = "You are a chef. Keep recommendations concise."
+
+prompt = ChatPromptTemplate.from_messages([
+    ("system", CHEF_SYSTEM_PROMPT),
+    MessagesPlaceholder("chat_history"),
+    ("user", "Suggest a famous dish from {location}.")
+])
 parser = StrOutputParser()
 
 # Chain
@@ -35,23 +83,27 @@ chain = prompt | gemini_llm | parser
 # Wrap chain with message history
 chain_with_memory = RunnableWithMessageHistory(
     chain,
-    get_session_history,  # must be a callable that returns ChatMessageHistory
+    get_session_history,  # must be a callable that returns a chat message history
     input_messages_key="location",   # what field to track
     history_messages_key="chat_history",  # key for passing history into prompt
     output_messages_key="output",   # what to log from output
 )
 
 # Example usage
-session_id = "abc123"
+async def main():
+    # The two answers are independent, so run them as separate conversations in parallel;
+    # distinct session ids keep their history writes on separate keys.
+    locations = (("Resp1", "Hyderabad", "a"), ("Resp2", "Telangana", "b"))
+    responses = await asyncio.gather(*(
+        chain_with_memory.ainvoke(
+            {"location": location},
+            config={"configurable": {"session_id": session_id}}
+        )
+        for _, location, session_id in locations
+    ))
+    for (label, _, _), response in zip(locations, responses):
+        print(f"{label}: {response}")
 
-resp1 = chain_with_memory.invoke(
-    {"location": "Hyderabad"},
-    config={"configurable": {"session_id": session_id}}
-)
-print("Resp1:", resp1)
 
-resp2 = chain_with_memory.invoke(
-    {"location": "Telangana"},
-    config={"configurable": {"session_id": session_id}}
-)
-print("Resp2:", resp2)
+if __name__ == "__main__":
+    asyncio.run(main())